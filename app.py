@@ -10,9 +10,16 @@ from utils import (
     plot_messages_by_sender, 
     plot_messages_timeline, 
     display_analysis, 
-    load_and_cache_data
+    display_comparison, 
+    compare_chats, 
+    get_view, 
+    load_and_cache_data, 
+    load_and_cache_chats, 
+    build_snapshot
 )
-from azure_client import generate_ai_insights, ai_chat_analysis
+
+# Chats at least this large default to a sampled word cloud
+APPROXIMATE_THRESHOLD = 1_000_000
 
 def main():
     st.markdown("""
@@ -24,51 +31,92 @@ def main():
     """, unsafe_allow_html=True)
     
     st.title("Advanced WhatsApp Chat Analyzer")
-    st.write("Upload your WhatsApp chat export file (in `.txt` format) for comprehensive analysis.")
-
-    uploaded_file = st.file_uploader("Choose a file", type=['txt'])
-
-    if uploaded_file:
-        # Load and cache the chat data
-        df = load_and_cache_data(uploaded_file)
-        unmatched_lines = st.session_state.unmatched_lines
-
-        if unmatched_lines > 0:
-            st.warning(f"Couldn't parse {unmatched_lines} lines. Please check the format.")
-
-        if len(df) > 0:
-            # Add filters for Sender and Date range
-            st.sidebar.header("Filters")
-            sender_filter = st.sidebar.selectbox("Select Sender", options=["All"] + list(df['sender'].unique()))
-            start_date = st.sidebar.date_input("Start Date", df['date'].min())
-            end_date = st.sidebar.date_input("End Date", df['date'].max())
-
-            filtered_df = filter_chat(df, sender=sender_filter if sender_filter != "All" else None, 
-                                      start_date=start_date, end_date=end_date)
-
-            # Update analysis based on filtered data
-            filtered_analysis = analyze_chat(filtered_df)
-
-            # Display analysis with filtered data
-            display_analysis(filtered_df, filtered_analysis)
-
-            # NEW: AI-Powered Insights Section
-            st.header("🤖 AI-Powered Insights")
-            with st.spinner('Generating advanced insights...'):
-                ai_insights = generate_ai_insights(filtered_df)
-                st.write(ai_insights)
-
-            # NEW: AI Chat Interface
-            st.header("💬 Chat with Your Data")
-            user_query = st.text_input("Ask a question about your chat data:")
-            
-            if user_query:
-                with st.spinner('Analyzing your query...'):
-                    ai_response = ai_chat_analysis(filtered_df, user_query)
-                    st.markdown(f"**Response:** {ai_response}")
-                      
+    st.write("Upload one or more WhatsApp chat exports (`.txt`, or `.zip` from \"export with media\") for comprehensive analysis. Snapshots saved from this app can be uploaded too.")
+
+    uploaded_files = st.file_uploader("Choose files", type=['txt', 'zip'], accept_multiple_files=True)
+
+    if uploaded_files:
+        # Load and cache the chat data; new uploads are parsed concurrently
+        chats = load_and_cache_chats(uploaded_files)
+        if not chats:
+            return
+
+        compare_label = "All chats (compare)"
+        names = [name for name, chat in chats]
+        choice = names[0]
+        if len(chats) > 1:
+            choice = st.sidebar.selectbox("Chat", options=[compare_label] + names)
+
+        if choice == compare_label:
+            show_comparison(chats)
         else:
-            st.error("No messages found in the file. Please check the format.")
+            show_chat(dict(chats)[choice], choice)
+
+# Combined and side-by-side view of several chats, built from per-chat aggregates
+def show_comparison(chats):
+    for name, chat in chats:
+        if len(chat.df) == 0:
+            st.warning(f"No messages found in {name}; it is left out of the comparison.")
+    chats = [(name, chat) for name, chat in chats if len(chat.df)]
+    if not chats:
+        st.error("No messages found in the files. Please check the format.")
+        return
+
+    first_date = min(chat.df['date'].min() for name, chat in chats)
+    last_date = max(chat.df['date'].max() for name, chat in chats)
+
+    st.sidebar.header("Filters")
+    start_date = st.sidebar.date_input("Start Date", first_date)
+    end_date = st.sidebar.date_input("End Date", last_date)
+
+    analyses, combined = compare_chats(chats, start_date, end_date)
+    display_comparison([name for name, chat in chats], analyses, combined)
+
+# Full dashboard for a single chat
+def show_chat(chat, name="chat"):
+    df = chat.df
+    unmatched_lines = chat.unmatched_lines
+
+    if unmatched_lines > 0:
+        st.warning(f"Couldn't parse {unmatched_lines} lines. Please check the format.")
+
+    if len(df) > 0:
+        # Add filters for Sender and Date range
+        st.sidebar.header("Filters")
+        sender_filter = st.sidebar.selectbox("Select Sender", options=["All"] + chat.profiles.senders)
+        start_date = st.sidebar.date_input("Start Date", df['date'].min())
+        end_date = st.sidebar.date_input("End Date", df['date'].max())
+
+        sender = sender_filter if sender_filter != "All" else None
+        view_key = (chat.key, sender, start_date, end_date)
+
+        # Counts, timelines and emoji come from the parse-time rollups and profiles and
+        # are exact either way; sampling only spares drawing the word cloud from every message
+        sampled = st.sidebar.toggle(
+            "Sample word cloud", value=len(df) >= APPROXIMATE_THRESHOLD,
+            help="Draw the word cloud from a uniform sample of 50,000 messages. Much faster for "
+                 "very large chats; all other figures stay exact."
+        )
+        full_wordcloud = sampled and st.sidebar.toggle(
+            "Build full word cloud in background",
+            help="Swap in a word cloud drawn from every message once it is ready."
+        )
+
+        # Filtered data and its analysis, memoized per view
+        filtered_df, filtered_analysis = get_view(view_key, chat, sampled)
+
+        # Snapshot of the parsed chat and its analysis, built only when downloaded
+        st.sidebar.download_button(
+            "Download snapshot", data=lambda: build_snapshot(chat),
+            file_name=f"{name.rsplit('.', 1)[0]}.snapshot.zip", mime="application/zip",
+            help="Save the parsed chat and its analysis. Upload the snapshot later to skip parsing."
+        )
+
+        # Display analysis with filtered data; expensive sections run only when opened
+        display_analysis(filtered_df, filtered_analysis, view_key, chat, full_wordcloud)
+
+    else:
+        st.error("No messages found in the file. Please check the format.")
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,3 @@
-import streamlit as st
-from openai import AzureOpenAI
 import os
 
 # Configuration for Azure OpenAI
@@ -8,9 +6,16 @@ AZURE_OPENAI_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT_0m", "")
 DEPLOYMENT_NAME = os.environ.get("DEPLOYMENT_NAME_0m", "")
 API_VERSION = os.environ.get("API_VERSION_0m", "")
 
+# Raised when the AI service is unavailable or a request fails, so callers never
+# mistake (or cache) an error message for a response
+class AIServiceError(Exception):
+    pass
+
 # Initialize Azure OpenAI client
 def get_azure_client():
     try:
+        # Imported on first use so the analysis core and app start without loading openai
+        from openai import AzureOpenAI
         client = AzureOpenAI(
             api_key=AZURE_OPENAI_API_KEY,
             api_version=API_VERSION,
@@ -21,24 +26,36 @@ def get_azure_client():
         print(f"Error initializing Azure OpenAI client: {str(e)}")
         return None
 
+# Sender part of the AI context. Sender profiles add word/emoji totals and activity
+# spans, and only the most active senders are listed so large groups fit the prompt.
+def sender_context(df, profiles=None, limit=25):
+    if profiles is None:
+        return df['sender'].nunique(), df['sender'].value_counts().to_string()
+    table = profiles.table
+    summary = table[['messages', 'words', 'emojis', 'first_seen', 'last_seen', 'peak_hour']].head(limit).to_string()
+    if len(table) > limit:
+        summary += f"\n    ... and {len(table) - limit} more senders with {table['messages'].iloc[limit:].sum()} messages"
+    return len(table), summary
+
 # Function to generate AI insights
-def generate_ai_insights(df):
+def generate_ai_insights(df, profiles=None):
     """
     Generate advanced insights using Azure OpenAI
     """
     client = get_azure_client()
     if not client:
-        return "AI insights unavailable"
+        raise AIServiceError("AI insights unavailable")
 
     # Prepare context for AI analysis
+    unique_senders, sender_summary = sender_context(df, profiles)
     context = f"""
     Chat Analysis Summary:
     - Total Messages: {len(df)}
     - Date Range: {df['date'].min()} to {df['date'].max()}
-    - Unique Senders: {df['sender'].nunique()}
+    - Unique Senders: {unique_senders}
     
     Sender Message Distribution:
-    {df['sender'].value_counts().to_string()}
+    {sender_summary}
     
     Top 5 Most Active Dates:
     {df.groupby('date').size().nlargest(5).to_string()}
@@ -62,27 +79,28 @@ def generate_ai_insights(df):
         )
         return response.choices[0].message.content.strip()
     except Exception as e:
-        return f"Error generating AI insights: {str(e)}"
+        raise AIServiceError(f"Error generating AI insights: {str(e)}") from e
 
 # NEW: AI Chatbot function for conversational analysis
-def ai_chat_analysis(df, user_query):
+def ai_chat_analysis(df, user_query, profiles=None):
     """
     Generate conversational responses about the chat data
     """
     client = get_azure_client()
     if not client:
-        return "AI chat unavailable"
+        raise AIServiceError("AI chat unavailable")
 
     # Prepare context with some key chat statistics
+    unique_senders, sender_summary = sender_context(df, profiles)
     context = f"""
     Chat Context:
     - Total Messages: {len(df)}
     - Date Range: {df['date'].min()} to {df['date'].max()}
-    - Unique Senders: {df['sender'].nunique()}
+    - Unique Senders: {unique_senders}
     - Average Messages per Day: {len(df) / ((df['date'].max() - df['date'].min()).days + 1):.2f}
     
     Sender Message Distribution:
-    {df['sender'].value_counts().to_string()}
+    {sender_summary}
     """
 
     try:
@@ -103,4 +121,4 @@ def ai_chat_analysis(df, user_query):
         )
         return response.choices[0].message.content.strip()
     except Exception as e:
-        return f"Error in chat analysis: {str(e)}"
+        raise AIServiceError(f"Error in chat analysis: {str(e)}") from e
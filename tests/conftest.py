@@ -0,0 +1,42 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from whatalyze import load_chat
+
+SENDERS = ['Alice', 'Bob', 'Chandra Rao', '+91 98765 43210', 'Dana']
+MESSAGES = [
+    'Good morning everyone',
+    'pizza tonight? 🍕',
+    'ok 👍🏽',
+    'family 👨‍👩‍👧 time',
+    'École demain à 9h',
+    'the meeting moved to THURSDAY',
+    'haha yes 😂😂',
+    '<Media omitted>',
+    'IMG-20230101-WA0001.jpg (file attached)',
+    'multi\nline message here',
+    'hi'
+]
+
+
+# Android-style export of n messages a few hours apart from start, deterministic per seed
+def make_export(n=3000, seed=0, start=datetime(2022, 12, 28, 8, 0)):
+    rng = random.Random(seed)
+    t = start
+    lines = []
+    for _ in range(n):
+        t += timedelta(minutes=rng.randint(1, 240))
+        lines.append(f"{t:%d/%m/%Y}, {t:%H:%M} - {rng.choice(SENDERS)}: {rng.choice(MESSAGES)}")
+    return '\n'.join(lines)
+
+
+@pytest.fixture(scope='session')
+def export():
+    return make_export().encode('utf-8')
+
+
+@pytest.fixture(scope='session')
+def chat(export):
+    return load_chat(export)
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from whatalyze import analyze_chat, extract_emojis, load_chat, merge_analyses
+from whatalyze.rollups import RollupStore
+
+from conftest import make_export
+
+
+@pytest.mark.parametrize('rollups', [False, True])
+def test_merge_matches_whole_chat(chat, rollups):
+    df = chat['df']
+    bounds = [0, 700, 1900, len(df)]
+    analyses = []
+    for start, stop in zip(bounds, bounds[1:]):
+        part = df.iloc[start:stop].reset_index(drop=True)
+        analyses.append(analyze_chat(part, extract_emojis(part),
+                                     rollups=RollupStore.build(part) if rollups else None))
+    merged = merge_analyses(analyses)
+    whole = analyze_chat(df, chat['emoji_data'])
+
+    assert not merged['approximate']
+    assert merged['error_bounds'] == {}
+    for name in ('total_messages', 'total_days', 'distinct_senders', 'most_common_emojis'):
+        assert merged[name] == whole[name]
+    assert merged['words_per_message'] == pytest.approx(whole['words_per_message'])
+    for name in ('messages_by_sender', 'messages_by_date', 'messages_by_hour', 'messages_by_weekday'):
+        pd.testing.assert_series_equal(merged[name].sort_index(), whole[name].sort_index(),
+                                       check_names=False, check_dtype=False, check_index_type=False)
+    emoji_counts = whole['emoji_counts'][whole['emoji_counts'] > 0]
+    pd.testing.assert_series_equal(merged['emoji_counts'][emoji_counts.index], emoji_counts,
+                                   check_names=False, check_dtype=False, check_index_type=False)
+    assert (merged['rollups'] is not None) == rollups
+
+
+def test_merge_of_distinct_chats():
+    first = load_chat(make_export(n=400, seed=1).encode('utf-8'))
+    second = load_chat(make_export(n=600, seed=2).encode('utf-8'))
+    merged = merge_analyses([analyze_chat(first['df'], first['emoji_data']),
+                             analyze_chat(second['df'], second['emoji_data'])])
+    both = pd.concat([first['df'], second['df']])
+    assert merged['total_messages'] == len(both)
+    pd.testing.assert_series_equal(merged['messages_by_sender'].sort_index(),
+                                   both['sender'].value_counts().sort_index(),
+                                   check_names=False, check_dtype=False, check_index_type=False)
+
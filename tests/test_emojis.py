@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from whatalyze import extract_emojis, filter_chat, filter_emojis, get_emoji_pattern
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('thumbs 👍🏽 up', ['👍🏽']),
+    ('skin tones 👋🏻👋🏿', ['👋🏻', '👋🏿']),
+    ('family 👨‍👩‍👧‍👦 time', ['👨‍👩‍👧‍👦']),
+    ('toned zwj 👩🏽‍💻 at work', ['👩🏽‍💻']),
+    ('flags 🇮🇳🇬🇧', ['🇮🇳', '🇬🇧']),
+    ('keycaps 1️⃣ #️⃣ 7⃣', ['1️⃣', '#️⃣', '7⃣']),
+    ('scotland 🏴󠁧󠁢󠁳󠁣󠁴󠁿!', ['🏴󠁧󠁢󠁳󠁣󠁴󠁿']),
+    ('variation ❤️ and plain ❤', ['❤️', '❤']),
+    ('mixed 😂😂 ok', ['😂', '😂']),
+    ('ascii only :) <3 #1 5* 100%', []),
+    ('accents only: École, naïve, 日本語', [])
+])
+def test_pattern_matches_whole_graphemes(text, expected):
+    assert get_emoji_pattern().findall(text) == expected
+
+
+def test_extract_emojis_counts_per_sender():
+    df = pd.DataFrame({
+        'sender': pd.Series(['Alice', 'Bob', 'Alice', 'Bob'], dtype=str),
+        'message': pd.Series(['hi 👍🏽👍🏽', 'plain ascii :)', '🇮🇳 and 👨‍👩‍👧', '👍🏽'], dtype=str)
+    })
+    emojis, emoji_matrix = extract_emojis(df)
+    assert emojis.index.tolist() == [0, 0, 2, 2, 3]
+    assert emoji_matrix.sparse.to_dense().to_dict('index') == {
+        'Alice': {'👍🏽': 2, '👨‍👩‍👧': 1, '🇮🇳': 1},
+        'Bob': {'👍🏽': 1, '👨‍👩‍👧': 0, '🇮🇳': 0}
+    }
+
+
+def test_extract_emojis_without_emoji():
+    df = pd.DataFrame({'sender': pd.Series(['Alice'], dtype=str), 'message': pd.Series(['hello'], dtype=str)})
+    emojis, emoji_matrix = extract_emojis(df)
+    assert len(emojis) == 0 and len(emoji_matrix) == 0
+
+
+# Dense sender x emoji counts with plain string labels, in sorted order
+def dense(emoji_matrix):
+    matrix = emoji_matrix.sparse.to_dense()
+    matrix.index = matrix.index.astype(str)
+    matrix.columns = matrix.columns.astype(str)
+    return matrix.sort_index(axis=0).sort_index(axis=1)
+
+
+@pytest.mark.parametrize('sender', [None, 'Bob'])
+def test_filter_emojis_matches_rows(chat, sender):
+    df = filter_chat(chat['df'], sender=sender, start_date='2023-02-10', end_date='2023-04-20')
+    emojis, emoji_matrix = filter_emojis(chat['emoji_data'], sender=sender, df=df)
+    expected, expected_matrix = extract_emojis(df)
+    assert sorted(emojis.index) == sorted(expected.index)
+    pd.testing.assert_frame_equal(dense(emoji_matrix), dense(expected_matrix), check_names=False)
+
+
+def test_filter_emojis_by_sender_only(chat):
+    emojis, emoji_matrix = filter_emojis(chat['emoji_data'], sender='Alice')
+    assert set(emojis['sender']) == {'Alice'}
+    assert emoji_matrix.index.tolist() == ['Alice']
+    assert int(emoji_matrix.sum(axis=1).iloc[0]) == len(emojis)
@@ -0,0 +1,106 @@
+import io
+import subprocess
+import zipfile
+import zlib
+
+import pandas as pd
+import pytest
+
+from whatalyze import READ_ERRORS, load_chat, load_chat_in_worker, write_snapshot
+from whatalyze.loader import read_chat_text
+
+from conftest import make_export
+
+
+# Zip archive holding the given members
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+# Export zip with media as exported from Android, one attachment present and one missing
+@pytest.fixture(scope='module')
+def media_export():
+    text = make_export(n=500, seed=1) + '\n01/03/2023, 10:00 - Bob: IMG-20230301-WA0002.jpg (file attached)'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('WhatsApp Chat with Friends.txt', text)
+        archive.writestr('IMG-20230101-WA0001.jpg', b'\xff\xd8' + b'\0' * 2048)
+    return buffer.getvalue()
+
+
+def assert_same_chat(loaded, chat):
+    pd.testing.assert_frame_equal(loaded['df'], chat['df'])
+    pd.testing.assert_frame_equal(loaded['attachments'], chat['attachments'])
+    pd.testing.assert_frame_equal(loaded['profiles'].table, chat['profiles'].table)
+    assert loaded['unmatched_lines'] == chat['unmatched_lines']
+    if chat['media_index'] is None:
+        assert loaded['media_index'] is None
+    else:
+        pd.testing.assert_frame_equal(loaded['media_index'], chat['media_index'])
+
+
+def test_worker_matches_load_chat(export, chat):
+    assert_same_chat(load_chat_in_worker(export), chat)
+
+
+def test_worker_reads_path(export, chat, tmp_path):
+    path = tmp_path / 'chat.txt'
+    path.write_bytes(export)
+    assert_same_chat(load_chat_in_worker(path), chat)
+
+
+@pytest.mark.parametrize('as_path', [False, True])
+def test_worker_matches_media_sizes(media_export, tmp_path, as_path):
+    source = media_export
+    if as_path:
+        source = tmp_path / 'export.zip'
+        source.write_bytes(media_export)
+    loaded = load_chat_in_worker(source)
+    assert_same_chat(loaded, load_chat(media_export))
+    assert loaded['attachments']['size'].notna().any()
+    assert loaded['attachments']['size'].isna().any()
+
+
+def test_worker_loads_snapshot_directly(chat, monkeypatch):
+    snapshot = write_snapshot(chat)
+    monkeypatch.setattr(subprocess, 'run', None)
+    assert_same_chat(load_chat_in_worker(snapshot), chat)
+
+
+def test_worker_unreadable_export():
+    with pytest.raises(ValueError, match='No chat text file'):
+        load_chat_in_worker(zip_of({'photo.jpg': b'\xff\xd8'}))
+    with pytest.raises(ValueError):
+        load_chat_in_worker(b'01/01/2023, 10:00 - Alice: \xff\xfe')
+
+
+def test_read_chat_text(export):
+    assert read_chat_text(export) == export.decode('utf-8')
+    assert read_chat_text(zip_of({'_chat.txt': export})) == export.decode('utf-8')
+
+
+
+# Copy of data with its bytes from start to stop overwritten
+def damaged(data, start, stop):
+    data = bytearray(data)
+    data[start:stop] = b'\0' * (stop - start)
+    return bytes(data)
+
+
+@pytest.mark.parametrize('load', [load_chat, load_chat_in_worker])
+def test_damaged_uploads_raise_read_errors(chat, load):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('_chat.txt', make_export(n=300))
+    deflated = buffer.getvalue()
+    with pytest.raises(zlib.error):
+        load(damaged(deflated, 60, 100))
+
+    snapshot = write_snapshot(chat)
+    footer = snapshot.rindex(b'ARROW1')
+    with pytest.raises(READ_ERRORS, match='Not an Arrow file'):
+        load(damaged(snapshot, footer - 200, footer + 6))
@@ -0,0 +1,123 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from whatalyze import find_attachments, index_media, load_chat, media_by_sender, open_chat
+
+# iOS export whose _chat.txt starts with a byte order mark; one photo is in the
+# zip, the voice note was not exported and one message was exported without media
+IOS_CHAT = (
+    '\ufeff[01/01/2023, 12:00:00] Alice: \u200e<attached: 00000012-PHOTO-2023-01-01-12-00-00.jpg>\n'
+    '[01/01/2023, 12:01:00] Bob: <attached: 00000013-AUDIO-2023-01-01-12-01-00.opus>\n'
+    '[01/01/2023, 12:02:00] Bob: hello\n'
+    '[02/01/2023, 09:00:00] Alice: \u200e<Media omitted>\n'
+)
+
+ANDROID_CHAT = (
+    '01/01/2023, 12:00 - Alice: IMG-20230101-WA0001.jpg (file attached)\n'
+    'look at this\n'
+    '01/01/2023, 12:05 - Bob: STK-20230101-WA0002.webp (file attached)\n'
+    '01/01/2023, 12:06 - Bob: VID-20230101-WA0003.mp4 (file attached)\n'
+    '01/01/2023, 12:07 - Chandra Rao: the file attached is old\n'
+    '01/01/2023, 12:08 - Chandra Rao: <Media omitted>\n'
+)
+
+
+# Zip archive holding the given members
+def zip_of(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def ios_export():
+    return zip_of({
+        'Chat/_chat.txt': IOS_CHAT.encode('utf-8'),
+        'Chat/00000012-PHOTO-2023-01-01-12-00-00.jpg': b'\xff\xd8' + b'\0' * 998
+    })
+
+
+@pytest.fixture(scope='module')
+def android_export():
+    return zip_of({
+        'WhatsApp Chat with Friends.txt': ANDROID_CHAT,
+        'IMG-20230101-WA0001.jpg': b'\xff\xd8' + b'\0' * 4094,
+        'STK-20230101-WA0002.webp': b'RIFF' + b'\0' * 96
+    })
+
+
+def test_byte_order_mark_is_stripped(ios_export):
+    for source in (ios_export, IOS_CHAT.encode('utf-8')):
+        with open_chat(source) as (lines, media_index):
+            assert next(lines).startswith('[01/01/2023')
+        chat = load_chat(source)
+        assert chat['unmatched_lines'] == 0
+        assert chat['df']['datetime'].iloc[0] == pd.Timestamp('2023-01-01 12:00')
+
+
+def test_index_media_reads_directory(android_export):
+    with zipfile.ZipFile(io.BytesIO(android_export)) as archive:
+        media_index = index_media(archive, chat_member='WhatsApp Chat with Friends.txt')
+    assert list(media_index['name']) == ['IMG-20230101-WA0001.jpg', 'STK-20230101-WA0002.webp']
+    assert list(media_index['size']) == [4096, 100]
+    assert list(media_index['type']) == ['image', 'sticker']
+    assert (media_index['compressed_size'] < media_index['size']).all()
+
+
+def test_ios_attachments(ios_export):
+    attachments = load_chat(ios_export)['attachments']
+    assert list(attachments.index) == [0, 1, 3]
+    assert list(attachments['sender']) == ['Alice', 'Bob', 'Alice']
+    assert list(attachments['omitted']) == [False, False, True]
+    assert attachments['name'].iloc[0] == '00000012-PHOTO-2023-01-01-12-00-00.jpg'
+    assert list(attachments['type'].iloc[:2]) == ['image', 'audio']
+    assert attachments['size'].iloc[0] == 1000
+    assert attachments['size'].iloc[1:].isna().all()
+
+
+def test_android_attachments(android_export):
+    chat = load_chat(android_export)
+    attachments = chat['attachments']
+    # The continuation line stays with its message; a mention of "file attached" is not an attachment
+    assert list(attachments.index) == [0, 1, 2, 4]
+    assert list(attachments['name'].iloc[:3]) == [
+        'IMG-20230101-WA0001.jpg', 'STK-20230101-WA0002.webp', 'VID-20230101-WA0003.mp4'
+    ]
+    assert list(attachments['type'].iloc[:3]) == ['image', 'sticker', 'video']
+    assert list(attachments['size'].iloc[:2]) == [4096, 100]
+    assert attachments['omitted'].iloc[3]
+    pd.testing.assert_frame_equal(find_attachments(chat['df'], chat['media_index']), attachments)
+
+
+def test_attachments_without_media_index():
+    chat = load_chat(ANDROID_CHAT.encode('utf-8'))
+    assert chat['media_index'] is None
+    assert len(chat['attachments']) == 4
+    assert chat['attachments']['size'].isna().all()
+
+
+def test_media_by_sender_counts_missing(android_export):
+    table = media_by_sender(load_chat(android_export)['attachments'])
+    assert table.loc['Alice', ['files', 'bytes', 'missing', 'image']].tolist() == [1, 4096, 0, 1]
+    assert table.loc['Bob', ['files', 'bytes', 'missing', 'sticker']].tolist() == [2, 100, 1, 1]
+    assert table.loc['Chandra Rao', ['files', 'bytes', 'missing']].tolist() == [1, 0, 1]
+    assert table['files'].is_monotonic_decreasing
+
+
+def test_media_by_sender_empty():
+    assert len(media_by_sender(find_attachments(load_chat(b'01/01/2023, 12:00 - Alice: hi\n')['df']))) == 0
+
+
+def test_open_chat_streams_lines(tmp_path, android_export):
+    path = tmp_path / 'export.zip'
+    path.write_bytes(android_export)
+    with open_chat(path) as (lines, media_index):
+        assert not isinstance(lines, str)
+        assert next(lines) == '01/01/2023, 12:00 - Alice: IMG-20230101-WA0001.jpg (file attached)\n'
+        assert len(media_index) == 2
+        assert sum(1 for _ in lines) == ANDROID_CHAT.count('\n') - 1
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import pytest
+
+from whatalyze import TimestampFormat, parse_chat
+from whatalyze.parsing import infer_timestamp_format
+
+
+def stamps(text, **kwargs):
+    return parse_chat(text, **kwargs)[0]['datetime'].dt.to_pydatetime().tolist()
+
+
+def test_day_first_inferred_from_day_above_twelve():
+    text = "13/01/2023, 10:00 - Alice: hi\n01/02/2023, 10:00 - Bob: hello"
+    assert stamps(text) == [datetime(2023, 1, 13, 10), datetime(2023, 2, 1, 10)]
+
+
+def test_month_first_inferred_from_day_above_twelve():
+    text = "01/13/2023, 10:00 - Alice: hi\n02/01/2023, 10:00 - Bob: hello"
+    assert stamps(text) == [datetime(2023, 1, 13, 10), datetime(2023, 2, 1, 10)]
+
+
+def test_late_evidence_applies_to_earlier_lines():
+    lines = [f"0{m}/01/2023, 09:00 - Alice: msg {m}" for m in range(1, 8)] + ["01/13/2023, 09:00 - Bob: late"]
+    fmt, replayed = infer_timestamp_format(lines)
+    assert not fmt.day_first
+    assert list(replayed) == lines
+    assert stamps('\n'.join(lines))[0] == datetime(2023, 1, 1, 9)
+
+
+@pytest.mark.parametrize('dates, expected', [
+    # Only day-first reads as chronological: Jan 5, Jan 6, Feb 1
+    (['05/01/2023', '06/01/2023', '01/02/2023'], datetime(2023, 1, 5)),
+    # Only month-first reads as chronological: Jan 5, Jan 6, Feb 1
+    (['01/05/2023', '01/06/2023', '02/01/2023'], datetime(2023, 1, 5)),
+    # Both readings are chronological: day-first wins the tie
+    (['03/04/2023'], datetime(2023, 4, 3))
+])
+def test_ambiguous_dates_follow_chronology(dates, expected):
+    text = '\n'.join(f"{d}, 00:00 - Alice: hi" for d in dates)
+    assert stamps(text)[0] == expected
+
+
+def test_day_first_can_be_forced():
+    text = "03/04/2023, 10:00 - Alice: hi"
+    assert stamps(text, day_first=False) == [datetime(2023, 3, 4, 10)]
+    assert stamps(text, day_first=True) == [datetime(2023, 4, 3, 10)]
+
+
+def test_conflicting_date_order_in_sample_raises():
+    with pytest.raises(ValueError, match='Conflicting date order'):
+        parse_chat("13/14/2023, 10:00 - Alice: hi")
+
+
+def test_later_date_in_other_order_continues_the_message():
+    text = ("13/01/2023, 10:00 - Alice: flight details\n"
+            "12/25/2023, 10:00 - departs JFK\n"
+            "01/14/2023, 10:00 - Bob: hello\n"
+            "14/01/2023, 11:00 - Bob: thanks")
+    df, unmatched_lines, sender_distribution = parse_chat(text)
+    assert df['message'].tolist() == [
+        'flight details\n12/25/2023, 10:00 - departs JFK\n01/14/2023, 10:00 - Bob: hello', 'thanks'
+    ]
+    assert df['datetime'].tolist() == [datetime(2023, 1, 13, 10), datetime(2023, 1, 14, 11)]
+    assert unmatched_lines == 0
+
+
+def test_twelve_hour_clock_and_two_digit_year():
+    text = ("1/2/23, 12:05 AM - Alice: midnight\n"
+            "1/2/23, 12:30 PM - Bob: noon\n"
+            "13/2/23, 1:15 pm - Alice: afternoon")
+    assert stamps(text) == [datetime(2023, 2, 1, 0, 5), datetime(2023, 2, 1, 12, 30),
+                            datetime(2023, 2, 13, 13, 15)]
+
+
+def test_ios_header_with_seconds_and_system_lines():
+    text = ("[13/01/2023, 10:00:00] \u200eMessages and calls are end-to-end encrypted.\n"
+            "\u200e[13/01/2023, 10:00:05] Alice: hi there\n"
+            "[13/01/2023, 10:01:00] Bob: hello")
+    df, unmatched_lines, sender_distribution = parse_chat(text)
+    assert df['datetime'].tolist() == [datetime(2023, 1, 13, 10, 0, 5), datetime(2023, 1, 13, 10, 1)]
+    assert df['sender'].tolist() == ['Alice', 'Bob']
+    assert unmatched_lines == 1
+    assert sender_distribution.to_dict() == {'Alice': 1, 'Bob': 1}
+
+
+def test_other_formats_and_invalid_dates_continue_the_message():
+    text = ("13/01/2023, 10:00 - Alice: first\n"
+            "14/01/23, 11:00 - Bob: other year width\n"
+            "14/01/2023, 11:00 PM - Bob: other clock\n"
+            "30/02/2023, 10:00 - Bob: no such day\n"
+            "14/01/2023, 09:00 - Bob: second")
+    df = parse_chat(text)[0]
+    assert df['message'].tolist() == [
+        "first\n14/01/23, 11:00 - Bob: other year width\n14/01/2023, 11:00 PM - Bob: other clock\n"
+        "30/02/2023, 10:00 - Bob: no such day",
+        "second"
+    ]
+
+
+def test_messages_are_sorted_by_time():
+    text = "14/01/2023, 09:00 - Bob: later\n13/01/2023, 10:00 - Alice: earlier"
+    assert parse_chat(text)[0]['message'].tolist() == ['earlier', 'later']
+
+
+def test_infer_without_headers():
+    fmt = TimestampFormat.infer([])
+    assert fmt.day_first and not fmt.four_digit_year and not fmt.twelve_hour
+    assert len(parse_chat("no headers here")[0]) == 0
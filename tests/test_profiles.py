@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from whatalyze import SenderProfiles, extract_emojis, filter_chat, load_chat
+
+from conftest import SENDERS
+
+
+def test_rows_match_sender_index(chat):
+    df, profiles = chat['df'], chat['profiles']
+    assert sorted(profiles.senders) == sorted(SENDERS)
+    for sender in profiles.senders:
+        pd.testing.assert_index_equal(df.index[profiles.rows(sender)], df.index[df['sender'] == sender])
+    assert len(profiles.rows('Nobody')) == 0
+
+
+# rows() are positions, not labels, when the table's index isn't 0..n-1
+def test_rows_on_a_filtered_table(chat):
+    df = chat['df'].iloc[::3]
+    profiles = SenderProfiles.build(df)
+    for sender in profiles.senders:
+        pd.testing.assert_index_equal(df.index[profiles.rows(sender)], df.index[df['sender'] == sender])
+
+
+@pytest.mark.parametrize('with_rollups', [False, True])
+def test_totals_match_groupby(chat, with_rollups):
+    df = chat['df']
+    profiles = SenderProfiles.build(df, chat['emoji_data'], chat['rollups'] if with_rollups else None)
+    table = profiles.table
+    groups = df.groupby('sender', observed=True)
+
+    pd.testing.assert_series_equal(table['messages'], groups.size().reindex(table.index),
+                                   check_names=False, check_dtype=False)
+    words = df['message'].str.count(r'\S+').groupby(df['sender'], observed=True).sum()
+    pd.testing.assert_series_equal(table['words'], words.reindex(table.index), check_names=False,
+                                   check_dtype=False)
+    emojis = chat['emoji_data'][0].groupby('sender', observed=True).size()
+    pd.testing.assert_series_equal(table['emojis'], emojis.reindex(table.index, fill_value=0),
+                                   check_names=False, check_dtype=False)
+    pd.testing.assert_series_equal(table['first_seen'], groups['datetime'].min().reindex(table.index),
+                                   check_names=False, check_dtype=False)
+    pd.testing.assert_series_equal(table['last_seen'], groups['datetime'].max().reindex(table.index),
+                                   check_names=False, check_dtype=False)
+    assert table['share'].sum() == pytest.approx(100)
+    assert table['messages'].is_monotonic_decreasing
+
+    hours = pd.crosstab(df['sender'], df['datetime'].dt.hour).reindex(columns=range(24), fill_value=0)
+    np.testing.assert_array_equal(profiles.hours.to_numpy(), hours.reindex(table.index).to_numpy())
+    np.testing.assert_array_equal(table['peak_hour'], hours.reindex(table.index).to_numpy().argmax(axis=1))
+
+
+def test_filter_chat_with_profiles(chat):
+    df = chat['df']
+    start, end = df['date'].iloc[500], df['date'].iloc[2000]
+    for sender in chat['profiles'].senders:
+        pd.testing.assert_frame_equal(
+            filter_chat(df, sender, start, end, profiles=chat['profiles']),
+            filter_chat(df, sender, start, end)
+        )
+
+
+def test_empty_chat():
+    df = load_chat(b'just a note\n')['df']
+    profiles = SenderProfiles.build(df, extract_emojis(df))
+    assert profiles.senders == []
+    assert len(profiles.rows('Alice')) == 0
@@ -0,0 +1,146 @@
+import gc
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from whatalyze import ChatRegistry
+
+
+# Chat-like data of about nbytes bytes
+def data(nbytes=1000):
+    return {'values': np.zeros(nbytes, dtype=np.uint8)}
+
+
+# Run fn in n threads started together and return their results or exceptions
+def run_together(fn, n=8):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_acquire_loads_once():
+    registry = ChatRegistry(max_bytes=10**6)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return data()
+
+    handles = run_together(lambda: registry.acquire('chat', loader))
+    assert len(calls) == 1
+    assert all(handle.values is handles[0].values for handle in handles)
+    assert registry.stats()['refs'] == len(handles)
+    assert registry._loading == {}
+
+
+def test_failing_loader_reaches_every_waiter():
+    registry = ChatRegistry(max_bytes=10**6)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("unreadable export")
+
+    results = run_together(lambda: registry.acquire('chat', loader))
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) and str(result) == "unreadable export" for result in results)
+    assert registry._loading == {}
+    assert 'chat' not in registry
+
+    # A later upload of the same export is parsed again
+    assert registry.acquire('chat', data).values.nbytes == 1000
+
+
+def test_release_makes_entry_evictable():
+    registry = ChatRegistry(max_bytes=2500)
+    first = registry.acquire('first', data)
+    second = registry.acquire('second', data)
+
+    # Over budget, but both chats are in use
+    third = registry.acquire('third', data)
+    assert registry.stats()['chats'] == 3
+
+    # Dropping the handle releases it through its finalizer; the least recently used goes first
+    del first
+    gc.collect()
+    fourth = registry.acquire('fourth', data)
+    assert 'first' not in registry
+    assert all(key in registry for key in ('second', 'third', 'fourth'))
+
+    # Releasing twice only drops one reference; the unreferenced chat goes while over budget
+    second.release()
+    second.release()
+    assert registry.stats()['refs'] == 2
+    assert 'second' not in registry
+
+    # Back under budget, unreferenced chats stay cached
+    third.release()
+    assert registry.stats() == {'chats': 2, 'nbytes': 2000, 'refs': 1, 'max_bytes': 2500}
+    assert fourth.values.nbytes == 1000
+
+
+def test_views_are_memoized_and_dropped_before_chats_in_use():
+    registry = ChatRegistry(max_bytes=10**6, max_views=2)
+    handle = registry.acquire('chat', lambda: data(1000))
+    calls = []
+
+    def compute(name, nbytes=100):
+        calls.append(name)
+        return data(nbytes)['values'], {}
+
+    assert handle.view('a', lambda: compute('a')).result()[0].nbytes == 100
+    handle.view('a', lambda: compute('a')).result()
+    assert calls == ['a']
+    handle.view('b', lambda: compute('b')).result()
+    handle.view('c', lambda: compute('c')).result()
+    assert list(registry._entries['chat']['views']) == ['b', 'c']
+    assert registry.stats()['nbytes'] == 1200
+
+    # Views that do not fit are dropped, the chat in use stays
+    registry.max_bytes = 1100
+    handle.view('d', lambda: compute('d')).result()
+    assert 'chat' in registry
+    assert list(registry._entries['chat']['views']) == ['d']
+    assert registry.stats()['nbytes'] == 1100
+
+    # Unreferenced chats go with their views
+    handle.release()
+    registry.acquire('other', lambda: data(1000))
+    assert 'chat' not in registry
+
+
+def test_view_errors_are_not_memoized():
+    registry = ChatRegistry(max_bytes=10**6)
+    handle = registry.acquire('chat', data)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        handle.view('a', fail).result()
+    assert registry._loading == {}
+    assert handle.view('a', lambda: (1, {})).result() == (1, {})
+
+
+def test_view_shares_objects_with_chat_without_counting_them():
+    registry = ChatRegistry(max_bytes=10**6)
+    handle = registry.acquire('chat', data)
+    handle.view('whole', lambda: (handle.values, {'values': handle.values})).result()
+    assert registry.stats()['nbytes'] == 1000
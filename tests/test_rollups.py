@@ -0,0 +1,80 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from whatalyze import analyze_chat, filter_chat, filter_emojis
+
+VIEWS = [
+    (None, None, None),
+    ('Bob', None, None),
+    # Partial weeks and months at both edges
+    (None, date(2023, 1, 4), date(2023, 3, 15)),
+    ('Alice', date(2023, 2, 14), date(2023, 5, 2)),
+    # Exactly one month, one Monday-to-Sunday week and a single day
+    (None, date(2023, 1, 1), date(2023, 1, 31)),
+    (None, date(2023, 2, 27), date(2023, 3, 5)),
+    ('Dana', date(2023, 4, 18), date(2023, 4, 18)),
+    # Open-ended ranges
+    (None, date(2023, 6, 10), None),
+    ('Chandra Rao', None, date(2023, 2, 1))
+]
+
+
+# Messages per bucket at a level, counted from the rows
+def bucket_counts(df, level):
+    times = df['datetime']
+    if level == 'hour':
+        buckets = times.dt.floor('h')
+    elif level == 'day':
+        buckets = times.dt.floor('D')
+    elif level == 'week':
+        buckets = times.dt.floor('D') - pd.to_timedelta(times.dt.weekday, unit='D')
+    else:
+        buckets = times.dt.to_period('M').dt.to_timestamp()
+    return df.groupby(buckets.rename('bucket')).size()
+
+
+@pytest.mark.parametrize('sender, start_date, end_date', VIEWS)
+def test_filter_totals_match_filter_chat(chat, sender, start_date, end_date):
+    df = filter_chat(chat['df'], sender=sender, start_date=start_date, end_date=end_date)
+    rollups = chat['rollups'].filter(sender=sender, start_date=start_date, end_date=end_date)
+
+    totals = rollups.totals()
+    words = df['message'].str.count(r'\S+')
+    expected = pd.DataFrame({
+        'messages': df.groupby('sender').size(),
+        'words': words.groupby(df['sender']).sum()
+    })
+    pd.testing.assert_frame_equal(totals.sort_index(), expected.sort_index(), check_dtype=False,
+                                  check_names=False)
+
+
+@pytest.mark.parametrize('sender, start_date, end_date', VIEWS)
+@pytest.mark.parametrize('level', ['hour', 'day', 'week', 'month'])
+def test_filter_buckets_match_filter_chat(chat, sender, start_date, end_date, level):
+    df = filter_chat(chat['df'], sender=sender, start_date=start_date, end_date=end_date)
+    rollups = chat['rollups'].filter(sender=sender, start_date=start_date, end_date=end_date)
+    pd.testing.assert_series_equal(rollups.series(level), bucket_counts(df, level), check_dtype=False,
+                                   check_names=False, check_index_type=False)
+
+
+@pytest.mark.parametrize('sender, start_date, end_date', VIEWS)
+@pytest.mark.parametrize('approximate', [False, True])
+def test_analysis_with_rollups_matches_rows(chat, sender, start_date, end_date, approximate):
+    df = filter_chat(chat['df'], sender=sender, start_date=start_date, end_date=end_date)
+    emoji_data = filter_emojis(chat['emoji_data'], sender=sender, df=df)
+    rollups = chat['rollups'].filter(sender=sender, start_date=start_date, end_date=end_date)
+
+    expected = analyze_chat(df, emoji_data)
+    result = analyze_chat(df, emoji_data, approximate=approximate, rollups=rollups)
+    for name in ('messages_by_date', 'messages_by_hour', 'messages_by_weekday'):
+        pd.testing.assert_series_equal(result[name].sort_index(), expected[name].sort_index(),
+                                       check_dtype=False, check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(result['messages_by_sender'].sort_index(),
+                                   expected['messages_by_sender'].sort_index(),
+                                   check_dtype=False, check_names=False)
+    assert result['distinct_senders'] == expected['distinct_senders']
+    assert result['total_days'] == expected['total_days']
+    assert result['words_per_message'] == pytest.approx(expected['words_per_message'])
+    assert not any(result['error_bounds'].values())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from whatalyze import SearchIndex, filter_chat, search_chat, search_messages
+from whatalyze.search import parse_query
+
+
+# Row positions a full scan finds: every term is a case-insensitive substring
+def scan(df, query):
+    folded = df['message'].astype(str).str.casefold()
+    mask = np.ones(len(df), dtype=bool)
+    for term in parse_query(query):
+        mask &= folded.str.contains(term, regex=False).to_numpy(dtype=bool)
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('query', [
+    'pizza', 'PIZZA', 'morning everyone', '"good morning"', 'école', 'thursday moved',
+    'line\nmessage', '👍🏽', 'hi', 'h', 'no such words here', '"yes 😂"'
+])
+def test_search_matches_scan(chat, query):
+    df = chat['df']
+    hits = search_messages(df, chat['search_index'], query)
+    np.testing.assert_array_equal(hits, scan(df, query))
+
+
+def test_build_is_independent_of_chunk_size(chat):
+    messages = chat['df']['message']
+    whole = SearchIndex.build(messages, chunk_size=len(messages))
+    chunked = SearchIndex.build(messages, chunk_size=97)
+    for name in ('trigrams', 'starts', 'rows'):
+        np.testing.assert_array_equal(getattr(chunked, name), getattr(whole, name))
+
+
+def test_search_chat_applies_filters(chat):
+    df = chat['df']
+    start_date, end_date = df['date'].iloc[500], df['date'].iloc[2000]
+    hits = search_chat(df, chat['search_index'], 'pizza', sender='Bob',
+                       start_date=start_date, end_date=end_date)
+    expected = filter_chat(df.iloc[scan(df, 'pizza')], sender='Bob', start_date=start_date, end_date=end_date)
+    assert hits.index.tolist() == expected.index.tolist()
+    assert len(hits) > 0
+
+
+def test_empty_query_and_empty_chat(chat):
+    assert len(search_messages(chat['df'], chat['search_index'], '   ')) == 0
+    df = chat['df'].iloc[:0]
+    assert len(search_messages(df, SearchIndex.build(df['message']), 'pizza')) == 0
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import whatalyze.analysis as analysis
+from whatalyze import FrequentItems, HyperLogLog, analyze_chat, reservoir_sample
+
+
+# Zipf-distributed stream of item names, so a few items dominate
+def zipf_items(n, seed=0):
+    ranks = np.random.default_rng(seed).zipf(1.3, n)
+    return pd.Series([f'item{r}' for r in ranks])
+
+
+@pytest.mark.parametrize('distinct', [10, 1_000, 200_000])
+def test_hyperloglog_estimate_within_bound(distinct):
+    sketch = HyperLogLog().add([f'sender {i}' for i in range(distinct)])
+    # Three standard errors, so the deterministic hashes pass comfortably
+    assert abs(sketch.estimate() - distinct) <= max(1, 3 * sketch.relative_error * distinct)
+
+
+def test_hyperloglog_ignores_duplicates_and_merges():
+    values = [f'sender {i}' for i in range(5_000)]
+    whole = HyperLogLog().add(values)
+    assert HyperLogLog().add(values + values).estimate() == whole.estimate()
+
+    merged = HyperLogLog().add(values[:3_000]).merge(HyperLogLog().add(values[2_000:]))
+    np.testing.assert_array_equal(merged.registers, whole.registers)
+
+    with pytest.raises(ValueError):
+        HyperLogLog(p=12).merge(HyperLogLog(p=14))
+
+
+# Kept counts never overcount and undercount by at most error; dropped items occur at most error times
+def assert_within_bounds(summary, items):
+    truth = items.value_counts()
+    kept = summary.counts
+    assert summary.total == len(items)
+    assert summary.error <= summary.total / (summary.k + 1)
+    assert (kept <= truth[kept.index]).all()
+    assert (truth[kept.index] - kept <= summary.error).all()
+    assert (truth.drop(kept.index) <= summary.error).all()
+
+
+def test_frequent_items_error_bounds():
+    items = zipf_items(50_000)
+    summary = FrequentItems(k=20).add(items)
+    assert_within_bounds(summary, items)
+    top = summary.top(5)
+    assert (top['lower'] <= items.value_counts()[top.index]).all()
+    assert (items.value_counts()[top.index] <= top['upper']).all()
+
+
+def test_frequent_items_merge_error_bounds():
+    items = zipf_items(60_000, seed=1)
+    parts = [FrequentItems(k=20).add(items.iloc[i:i + 20_000]) for i in range(0, len(items), 20_000)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert_within_bounds(merged, items)
+
+
+def test_reservoir_sample():
+    df = pd.DataFrame({'value': range(1_000)})
+    sample = reservoir_sample(df, 100)
+    assert len(sample) == 100
+    assert sample.index.is_monotonic_increasing and sample.index.is_unique
+    assert reservoir_sample(df, 5_000) is df
+
+
+def test_approximate_senders_across_chunks(chat, monkeypatch):
+    df = chat['df']
+    monkeypatch.setattr(analysis, 'CHUNK_SIZE', 500)
+    result = analyze_chat(df, chat['emoji_data'], approximate=True)
+    bounds = result['error_bounds']
+    truth = df['sender'].value_counts()
+    counts = result['messages_by_sender']
+    assert (counts <= truth[counts.index]).all()
+    assert (truth[counts.index] - counts <= bounds['messages_by_sender']).all()
+    assert abs(result['distinct_senders'] - len(truth)) <= max(1, bounds['distinct_senders'])
+
+
+def test_approximate_senders_single_chunk_is_exact(chat):
+    df = chat['df']
+    result = analyze_chat(df, chat['emoji_data'], approximate=True)
+    pd.testing.assert_series_equal(result['messages_by_sender'], df['sender'].value_counts())
+    assert result['distinct_senders'] == df['sender'].nunique()
+    assert result['error_bounds']['messages_by_sender'] == 0
+
+
+def test_merge_keeps_exact_distinct_senders(chat):
+    analyses = [
+        analyze_chat(chat['df'], chat['emoji_data'], approximate=True, rollups=chat['rollups']),
+        analyze_chat(chat['df'].iloc[:1000], approximate=True)
+    ]
+    merged = analysis.merge_analyses(analyses)
+    assert merged['approximate']
+    assert merged['distinct_senders'] == chat['df']['sender'].nunique()
+    assert merged['error_bounds']['distinct_senders'] == 0
+    assert merged['sender_sketch'] is None
+
+
+def test_merge_sketches_truncated_sender_counts(monkeypatch):
+    times = pd.Series(pd.date_range('2023-01-01', periods=20_000, freq='min'))
+    senders = zipf_items(20_000, seed=2).str.replace('item', 'sender ')
+    df = pd.DataFrame({'datetime': times, 'date': times.dt.date, 'sender': senders, 'message': 'hi'})
+    monkeypatch.setattr(analysis, 'CHUNK_SIZE', 5_000)
+    analyses = [analyze_chat(df.iloc[:10_000], approximate=True), analyze_chat(df.iloc[10_000:], approximate=True)]
+    assert all(a['error_bounds']['messages_by_sender'] for a in analyses)
+
+    merged = analysis.merge_analyses(analyses)
+    truth = df['sender'].nunique()
+    assert merged['sender_sketch'] is not None
+    assert 0 < merged['error_bounds']['distinct_senders']
+    assert abs(merged['distinct_senders'] - truth) <= 1.5 * merged['error_bounds']['distinct_senders']
@@ -0,0 +1,90 @@
+import io
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from whatalyze import analyze_chat, count_words, load_chat, load_snapshot, write_snapshot
+from whatalyze.rollups import LEVELS
+from whatalyze.snapshot import read_manifest
+
+from conftest import make_export
+
+
+# Export zip with media, as exported by "export with media" on Android
+@pytest.fixture(scope='module')
+def media_chat():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('WhatsApp Chat with Friends.txt', make_export(n=500, seed=1))
+        archive.writestr('IMG-20230101-WA0001.jpg', b'\xff\xd8' + b'\0' * 2048)
+    return load_chat(buffer.getvalue())
+
+
+def assert_chats_equal(loaded, chat):
+    pd.testing.assert_frame_equal(loaded['df'], chat['df'])
+    pd.testing.assert_frame_equal(loaded['emoji_data'][0], chat['emoji_data'][0], check_dtype=False,
+                                  check_categorical=False)
+    pd.testing.assert_frame_equal(loaded['emoji_data'][1], chat['emoji_data'][1])
+    pd.testing.assert_frame_equal(loaded['attachments'], chat['attachments'])
+    if chat['media_index'] is None:
+        assert loaded['media_index'] is None
+    else:
+        pd.testing.assert_frame_equal(loaded['media_index'], chat['media_index'])
+    for level in LEVELS:
+        pd.testing.assert_frame_equal(loaded['rollups'].levels[level], chat['rollups'].levels[level])
+    pd.testing.assert_frame_equal(loaded['profiles'].table, chat['profiles'].table)
+    pd.testing.assert_frame_equal(loaded['profiles'].hours, chat['profiles'].hours)
+    np.testing.assert_array_equal(loaded['profiles'].positions, chat['profiles'].positions)
+    for name in ('trigrams', 'starts', 'rows'):
+        np.testing.assert_array_equal(getattr(loaded['search_index'], name), getattr(chat['search_index'], name))
+    assert loaded['unmatched_lines'] == chat['unmatched_lines']
+
+
+@pytest.mark.parametrize('compression', [None, 'zstd'])
+def test_round_trip_bytes(chat, compression):
+    loaded = load_snapshot(write_snapshot(chat, compression=compression))
+    assert_chats_equal(loaded, chat)
+
+    expected = analyze_chat(chat['df'], chat['emoji_data'], rollups=chat['rollups'], profiles=chat['profiles'])
+    for name in ('messages_by_sender', 'messages_by_date', 'messages_by_hour', 'messages_by_weekday', 'emoji_counts'):
+        pd.testing.assert_series_equal(loaded['analysis'][name], expected[name], check_names=False,
+                                       check_dtype=False)
+    for name in ('total_messages', 'total_days', 'distinct_senders', 'most_common_emojis'):
+        assert loaded['analysis'][name] == expected[name]
+    pd.testing.assert_series_equal(loaded['word_counts'], count_words(chat['df']))
+
+
+def test_round_trip_path_is_aligned(media_chat, tmp_path):
+    path = tmp_path / 'chat.snapshot.zip'
+    write_snapshot(media_chat, path)
+    assert_chats_equal(load_snapshot(path), media_chat)
+    assert load_chat(path)['media_index']['name'].tolist() == ['IMG-20230101-WA0001.jpg']
+
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED
+            if info.filename.endswith('.arrow'):
+                name_length, extra_length = len(info.filename.encode('utf-8')), len(info.extra)
+                assert (info.header_offset + 30 + name_length + extra_length) % 64 == 0
+
+
+def test_snapshot_without_words(chat):
+    loaded = load_snapshot(write_snapshot(chat, words=False))
+    assert 'word_counts' not in loaded
+    # Saving it again counts the words it lacks
+    pd.testing.assert_series_equal(load_snapshot(write_snapshot(loaded))['word_counts'], count_words(chat['df']))
+
+
+def test_read_manifest(chat, export):
+    assert read_manifest(export) is None
+    manifest = read_manifest(write_snapshot(chat))
+    assert manifest['tables']['messages']['rows'] == len(chat['df'])
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('manifest.json', json.dumps({'format': 'whatalyze-snapshot', 'version': 99}))
+    with pytest.raises(ValueError):
+        read_manifest(buffer.getvalue())
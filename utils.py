@@ -1,183 +1,63 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from datetime import datetime
-import re
-from collections import Counter
-import emoji
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-
-# Function to parse chat messages
-@st.cache_data
-def parse_chat(text):
-    patterns = [
-        r'\[(\d{1,2}/\d{1,2}/\d{2,4}),\s*(\d{1,2}:\d{2}:\d{2})\]\s+(.+?):\s+(.*)',  # [dd/mm/yy, HH:MM:SS]
-        r'(\d{1,2}/\d{1,2}/\d{2,4}),\s*(\d{1,2}:\d{2}\s*[APap][Mm])\s*-\s*(.+?):\s*(.*)'  # dd/mm/yy, HH:MM AM/PM -
-    ]
-    messages = []
-    current_message = None
-    unmatched_lines = 0
-
-    for line in text.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-
-        match = None
-        for pattern in patterns:
-            match = re.match(pattern, line)
-            if match:
-                break  # Stop at the first match
-
-        if match:
-            # Extract components for matched lines
-            date, time, sender, message = match.groups()
-
-            try:
-                # Normalize two-digit years
-                if len(date.split('/')[-1]) == 2:
-                    date = date.replace(date.split('/')[-1], '20' + date.split('/')[-1])
-
-                datetime_str = f"{date} {time}"
-                date_formats = [
-                    '%d/%m/%Y %H:%M:%S',
-                    '%d/%m/%Y %H:%M',
-                    '%d/%m/%Y %I:%M %p',
-                    '%m/%d/%Y %H:%M:%S',
-                    '%m/%d/%Y %H:%M',
-                    '%m/%d/%Y %I:%M %p'
-                ]
-
-                dt = None
-                for fmt in date_formats:
-                    try:
-                        dt = datetime.strptime(datetime_str, fmt)
-                        break
-                    except ValueError:
-                        continue
-
-                if dt:
-                    if current_message:
-                        # Append the current message to the list if a new message starts
-                        messages.append(current_message)
-                    current_message = {
-                        'datetime': dt,
-                        'date': dt.date(),
-                        'time': dt.time(),
-                        'sender': sender.strip(),
-                        'message': message.strip()
-                    }
-            except Exception as e:
-                unmatched_lines += 1
-                print(f"Error processing line: {line}. Error: {e}")
-        elif current_message:
-            # Continuation of previous message
-            current_message['message'] += '\n' + line.strip()
-        else:
-            # Handle unmatched lines (e.g., media omitted)
-            unmatched_lines += 1
-            print(f"Unmatched line: {line}")
-
-    # Append the last message if exists
-    if current_message:
-        messages.append(current_message)
-
-    # Create DataFrame
-    df = pd.DataFrame(messages)
-
-    if 'sender' not in df.columns:
-        print("Warning: 'sender' column is missing.")
-        print(df.head())  # Show the first few rows of the dataframe for debugging
-
-    if 'datetime' in df.columns and not df['datetime'].isnull().all():
-        df = df.sort_values(by='datetime').reset_index(drop=True)
-    else:
-        print("Datetime column is missing or contains only null values.")
-
-    # Calculate distribution by sender
-    sender_distribution = df['sender'].value_counts() if 'sender' in df.columns else pd.Series()
-
-    return df, unmatched_lines, sender_distribution
-
-# Function to filter chat messages based on sender and date range
-@st.cache_data
-def filter_chat(df, sender=None, start_date=None, end_date=None):
-    if sender:
-        df = df[df['sender'] == sender]
-    if start_date:
-        df = df[df['date'] >= pd.to_datetime(start_date).date()]
-    if end_date:
-        df = df[df['date'] <= pd.to_datetime(end_date).date()]
-    return df
-
-# Function to analyze the chat data
-@st.cache_data
-def analyze_chat(df):
-    total_messages = len(df)
-    total_days = (df['date'].max() - df['date'].min()).days
-    avg_messages_per_day = total_messages / total_days if total_days > 0 else 0
-
-    # Messages by sender
-    messages_by_sender = df['sender'].value_counts()
-
-    # Messages by date
-    messages_by_date = df.groupby('date').size()
-
-    # Messages by hour
-    df['hour'] = df['datetime'].dt.hour
-    messages_by_hour = df.groupby('hour').size()
-
-    # Messages by weekday
-    df['weekday'] = df['datetime'].dt.day_name()
-    messages_by_weekday = df.groupby('weekday').size()
-
-    # Word count
-    df['word_count'] = df['message'].str.split().str.len()
-    words_per_message = df['word_count'].mean()
-
-    # Emoji analysis
-    all_emojis = [char for message in df['message'] for char in message if emoji.is_emoji(char)]
-    most_common_emojis = Counter(all_emojis).most_common(10)
-
-    return {
-        'total_messages': total_messages,
-        'total_days': total_days,
-        'avg_messages_per_day': avg_messages_per_day,
-        'messages_by_sender': messages_by_sender,
-        'messages_by_date': messages_by_date,
-        'messages_by_hour': messages_by_hour,
-        'messages_by_weekday': messages_by_weekday,
-        'words_per_message': words_per_message,
-        'most_common_emojis': most_common_emojis
-    }
-
-# Create a word cloud from the chat messages
-def create_wordcloud(df):
-    all_messages = ' '.join(df['message'].astype(str))
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(all_messages)
-    return wordcloud
+import os
+import subprocess
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from whatalyze import (
+    READ_ERRORS,
+    ChatRegistry,
+    analyze_chat,
+    create_wordcloud,
+    filter_chat,
+    filter_emojis,
+    fingerprint,
+    hits_timeline,
+    load_chat,
+    load_chat_in_worker,
+    media_by_sender,
+    merge_analyses,
+    parse_chat,
+    search_chat,
+    write_snapshot
+)
+from azure_client import AIServiceError, generate_ai_insights, ai_chat_analysis
 
 # Plot the emoji analysis
 def plot_emoji_analysis(analysis):
     st.header("Top Emojis Used")
+    if not analysis['most_common_emojis']:
+        st.info("No emojis found in the selected messages.")
+        return
     emoji_labels, emoji_counts = zip(*analysis['most_common_emojis'])
     fig_emojis = px.bar(x=emoji_labels, y=emoji_counts, title="Most Used Emojis")
     st.plotly_chart(fig_emojis)
 
+    # Top emojis of the most active senders, straight from the sender x emoji matrix
+    emoji_matrix = analysis['emoji_matrix']
+    if len(emoji_matrix) > 1:
+        top_senders = analysis['messages_by_sender'].index[:10].intersection(emoji_matrix.index, sort=False)
+        sender_emojis = emoji_matrix.loc[top_senders, list(emoji_labels)].sparse.to_dense()
+        fig_senders = px.imshow(sender_emojis, text_auto=True, aspect='auto',
+                                title="Top Emojis by Sender")
+        st.plotly_chart(fig_senders)
+
 # Optimized plotting function for the sender distribution
 def plot_messages_by_sender(analysis):
     st.header("Message Distribution by Sender")
     total_messages = analysis['total_messages']
     sender_data = analysis['messages_by_sender']
 
-    # Calculate the percentage of total messages for each sender
-    sender_percent = (sender_data / total_messages) * 100
+    # Percentage of total messages for each sender, precomputed in the profiles for the whole chat
+    profiles = analysis['profiles']
+    sender_percent = profiles.table['share'] if profiles is not None else (sender_data / total_messages) * 100
 
     # Group senders with less than 2% into an 'Others' category
     threshold = 1  # Percentage threshold
     small_senders = sender_data[sender_percent < threshold]
-    others_count = small_senders.sum()
+    # Approximate analyses only keep the top senders; the remainder also counts as 'Others'
+    others_count = small_senders.sum() + total_messages - sender_data.sum()
 
     # Keep only senders above the threshold and add the 'Others' group
     filtered_senders = sender_data[sender_percent >= threshold]
@@ -211,44 +91,336 @@ def plot_activity_by_weekday(analysis):
                          title="Messages by Day of Week")
     st.plotly_chart(fig_weekday)
 
-# Main display function
-def display_analysis(df, analysis):
-    # Display basic stats
-    st.header("Chat Overview")
-    col1, col2, col3 = st.columns(3)
+# Search box with the matching messages and their timeline, narrowed by the current filters
+def plot_search(chat, view_key):
+    st.header("🔍 Search Messages")
+    query = st.text_input('Search for words or an "exact phrase":', key="search_query")
+    if not query:
+        return
+
+    chat_key, sender, start_date, end_date = view_key
+    hits = search_chat(chat.df, chat.search_index, query,
+                       sender=sender, start_date=start_date, end_date=end_date)
+    st.write(f"{len(hits)} matching messages")
+    if len(hits) == 0:
+        return
+
+    timeline = hits_timeline(hits)
+    fig_hits = px.bar(x=timeline.index, y=timeline.values, title="Matches per Day")
+    st.plotly_chart(fig_hits)
+    st.dataframe(hits[['datetime', 'sender', 'message']].tail(1000), hide_index=True)
+
+# Media shared per sender in the filtered chat, from its attachment lines
+def plot_media_by_sender(chat, df):
+    st.header("Media Shared")
+    attachments = chat.attachments
+    attachments = attachments[attachments.index.isin(df.index)]
+    if len(attachments) == 0:
+        st.info("No media found in the selected messages.")
+        return
+    media = media_by_sender(attachments)
+    fig_media = px.bar(x=media.index, y=media['files'], title="Media Files by Sender")
+    st.plotly_chart(fig_media)
+    st.dataframe(media)
+    if chat.media_index is None:
+        st.caption("File sizes are only known for zip exports that include media.")
+
+# Filtered frame and analysis for one view of a chat
+def compute_view(view_key, chat, approximate=False):
+    chat_key, sender, start_date, end_date = view_key
+    df = chat.df
+    filtered_df = filter_chat(df, sender=sender, start_date=start_date, end_date=end_date,
+                              profiles=chat.profiles)
+    # Emoji counts come from the parse-time matrix; rows only need matching for a narrowed date range
+    full_range = start_date <= df['date'].min() and end_date >= df['date'].max()
+    emoji_data = filter_emojis(chat.emoji_data, sender=sender, df=None if full_range else filtered_df)
+    # Time and sender aggregates come from the parse-time rollups narrowed to the same view,
+    # and from the sender profiles when the view is the whole chat
+    rollups = chat.rollups.filter(sender=sender, start_date=None if full_range else start_date,
+                                  end_date=None if full_range else end_date)
+    profiles = chat.profiles if full_range and not sender else None
+    return filtered_df, analyze_chat(filtered_df, emoji_data, approximate=approximate,
+                                     rollups=rollups, profiles=profiles)
+
+# compute_view shared across reruns and sessions. Views are memoized in the chat's
+# registry entry, so they count against its memory budget and are evicted with the chat.
+def get_view(view_key, chat, approximate=False):
+    return chat.view((view_key, approximate), lambda: compute_view(view_key, chat, approximate)).result()
+
+# Worker threads for full word clouds requested while a sampled one is shown
+@st.cache_resource
+def get_background_executor():
+    return ThreadPoolExecutor(max_workers=2)
+
+# Poll a background computation and rerun the app once it is ready
+@st.fragment(run_every=2)
+def wait_for_background(future, message):
+    if future.done():
+        st.rerun()
+    st.caption(message)
+
+# Analyses of several chats over one date range, and their merged combination
+def compare_chats(chats, start_date, end_date, approximate=False):
+    analyses = [
+        get_view((chat.key, None, start_date, end_date), chat, approximate)[1]
+        for name, chat in chats
+    ]
+    return analyses, merge_analyses(analyses)
+
+# Word cloud image for one view, rendered only when its tab is first opened.
+# The image is memoized with the chat's views, so it counts against the registry
+# budget and is evicted with the chat. With an executor the Future of the image
+# is returned instead, rendered in the background.
+def get_wordcloud_image(chat, view_key, df, sampled=False, executor=None):
+    future = chat.view((view_key, 'wordcloud', sampled), lambda: create_wordcloud(df).to_array(), executor)
+    return future if executor is not None else future.result()
+
+# AI insights for one view, generated only when their tab is first opened.
+# Bumping the nonce regenerates them for that view alone. Failures raise
+# AIServiceError, so they are shown but never cached.
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_ai_insights(view_key, nonce, _df, _profiles=None):
+    return generate_ai_insights(_df, _profiles)
+
+# AI answer for one view and question; failures are not cached either
+@st.cache_data(max_entries=128, show_spinner=False)
+def get_ai_answer(view_key, user_query, _df, _profiles=None):
+    return ai_chat_analysis(_df, user_query, _profiles)
+
+# Basic stats of an analysis, with error bounds when it is approximate
+def display_overview(analysis, title="Chat Overview"):
+    st.header(title)
+    bounds = analysis['error_bounds']
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Messages", analysis['total_messages'])
     with col2:
         st.metric("Total Days", analysis['total_days'])
     with col3:
         st.metric("Avg Messages/Day", f"{analysis['avg_messages_per_day']:.1f}")
+    with col4:
+        senders_help = f"Estimate, ±{bounds['distinct_senders']:.0f} (95%)" if bounds.get('distinct_senders') else None
+        st.metric("Senders", analysis['distinct_senders'], help=senders_help)
+
+    # Only the estimates that are not exact for this view are mentioned
+    if analysis['approximate']:
+        notes = []
+        if bounds['messages_by_sender']:
+            notes.append(f"sender counts may be up to {bounds['messages_by_sender']} low")
+        if bounds['most_common_emojis']:
+            notes.append(f"emoji counts may be up to {bounds['most_common_emojis']} low")
+        if bounds['words_per_message']:
+            notes.append(f"word statistics use a sample of {len(analysis['sample'])} messages "
+                         f"(words/message ±{bounds['words_per_message']:.2f})")
+        elif len(analysis['sample']) < analysis['total_messages']:
+            notes.append(f"the word cloud uses a sample of {len(analysis['sample'])} messages")
+        if notes:
+            st.caption(f"Approximate analytics: {', '.join(notes)}.")
+
+# Side-by-side comparison of several chats plus their combined analysis
+def display_comparison(names, analyses, combined):
+    display_overview(combined, title="Combined Overview")
+
+    compare, senders, activity, emojis = st.tabs(
+        ["Comparison", "Senders", "Activity", "Emojis"], on_change="rerun", key="compare_section"
+    )
+
+    if compare.open:
+        with compare:
+            st.header("Messages per Chat")
+            totals = pd.Series([a['total_messages'] for a in analyses], index=names)
+            st.plotly_chart(px.bar(x=totals.index, y=totals.values, title="Total Messages"))
+
+            st.header("Timeline by Chat")
+            timelines = pd.DataFrame({name: a['messages_by_date'] for name, a in zip(names, analyses)}).sort_index()
+            st.plotly_chart(px.line(timelines, title="Messages per Day"))
+
+    if senders.open:
+        with senders:
+            plot_messages_by_sender(combined)
+            st.header("Senders per Chat")
+            senders_per_chat = pd.Series([a['distinct_senders'] for a in analyses], index=names)
+            st.plotly_chart(px.bar(x=senders_per_chat.index, y=senders_per_chat.values, title="Distinct Senders"))
+
+    if activity.open:
+        with activity:
+            # Shares rather than counts so chats of different sizes compare fairly
+            st.header("Activity by Hour")
+            by_hour = pd.DataFrame({name: a['messages_by_hour'] / a['total_messages'] * 100
+                                    for name, a in zip(names, analyses)}).reindex(range(24)).fillna(0)
+            st.plotly_chart(px.bar(by_hour, barmode='group', title="% of Messages by Hour of Day"))
+
+            st.header("Activity by Weekday")
+            weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+            by_weekday = pd.DataFrame({name: a['messages_by_weekday'] / a['total_messages'] * 100
+                                       for name, a in zip(names, analyses)}).reindex(weekday_order).fillna(0)
+            st.plotly_chart(px.bar(by_weekday, barmode='group', title="% of Messages by Day of Week"))
+
+    if emojis.open:
+        with emojis:
+            plot_emoji_analysis(combined)
+
+# Main display function. Sections live in tabs that only run when opened,
+# and their results are memoized per view so reopening them is instant.
+# With full_wordcloud, a sampled word cloud is replaced by one drawn from
+# every message once it has been rendered in the background.
+def display_analysis(df, analysis, view_key, chat, full_wordcloud=False):
+    display_overview(analysis)
+
+    senders, activity, timeline, emojis, media, words, search, ai = st.tabs(
+        ["Senders", "Activity", "Timeline", "Emojis", "Media", "Word Cloud", "Search", "🤖 AI Insights"],
+        on_change="rerun", key="section"
+    )
 
-    # Plot charts
-    plot_messages_by_sender(analysis)
-    plot_activity_by_hour(analysis)
-    plot_activity_by_weekday(analysis)
-
-    # Word Cloud
-    st.header("Word Cloud")
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(" ".join(df['message']))
-    fig, ax = plt.subplots()
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis('off')
-    st.pyplot(fig)
-    
-# Plot messages timeline
+    if senders.open:
+        with senders:
+            plot_messages_by_sender(analysis)
+
+    if activity.open:
+        with activity:
+            plot_activity_by_hour(analysis)
+            plot_activity_by_weekday(analysis)
+
+    if timeline.open:
+        with timeline:
+            plot_messages_timeline(analysis)
+
+    if emojis.open:
+        with emojis:
+            plot_emoji_analysis(analysis)
+
+    if media.open:
+        with media:
+            plot_media_by_sender(chat, df)
+
+    if words.open:
+        with words:
+            st.header("Word Cloud")
+            # Approximate analyses draw the cloud from their message sample
+            sample = analysis['sample']
+            full = None
+            if sample is not None and full_wordcloud:
+                full = get_wordcloud_image(chat, view_key, df, executor=get_background_executor())
+            if full is not None and full.done():
+                st.image(full.result())
+            else:
+                with st.spinner('Building word cloud...'):
+                    st.image(get_wordcloud_image(chat, view_key, df if sample is None else sample,
+                                                 sampled=sample is not None))
+                if full is not None:
+                    wait_for_background(full, "Building the word cloud from every message in the background...")
+
+    if search.open:
+        with search:
+            plot_search(chat, view_key)
+
+    if ai.open:
+        with ai:
+            st.header("🤖 AI-Powered Insights")
+            nonces = st.session_state.setdefault('insights_nonce', {})
+            with st.spinner('Generating advanced insights...'):
+                try:
+                    st.write(get_ai_insights(view_key, nonces.get(view_key, 0), df, analysis['profiles']))
+                except AIServiceError as e:
+                    st.error(str(e))
+            if st.button("Regenerate insights"):
+                nonces[view_key] = nonces.get(view_key, 0) + 1
+                st.rerun()
+
+            st.header("💬 Chat with Your Data")
+            user_query = st.text_input("Ask a question about your chat data:")
+
+            if user_query:
+                with st.spinner('Analyzing your query...'):
+                    try:
+                        ai_response = get_ai_answer(view_key, user_query, df, analysis['profiles'])
+                        st.markdown(f"**Response:** {ai_response}")
+                    except AIServiceError as e:
+                        st.error(str(e))
+
+# Plot messages timeline. With rollups the resolution is selectable and each
+# point is read from the matching bucket level.
 def plot_messages_timeline(analysis):
     st.header("Messages Timeline")
-    fig_timeline = px.line(x=analysis['messages_by_date'].index,
-                           y=analysis['messages_by_date'].values,
-                           title="Messages per Day")
+    rollups = analysis['rollups']
+    resolution = "Day"
+    if rollups is not None:
+        resolution = st.radio("Resolution", ["Hour", "Day", "Week", "Month"], index=1,
+                              horizontal=True, key="timeline_resolution")
+    timeline = analysis['messages_by_date'] if resolution == "Day" else rollups.series(resolution.lower())
+    fig_timeline = px.line(x=timeline.index,
+                           y=timeline.values,
+                           title=f"Messages per {resolution}")
     st.plotly_chart(fig_timeline)
 
-# Function to cache data
+# Process-wide chat registry shared by all sessions
+@st.cache_resource
+def get_chat_registry():
+    max_bytes = int(os.environ.get("WHATALYZE_CACHE_MB", "1024")) * 1024 * 1024
+    return ChatRegistry(max_bytes)
+
+# Threads for parsing several uploads at once. Each parse runs in a worker
+# process started with `python -m whatalyze.worker`, which imports only the
+# whatalyze core rather than re-running this page and its UI imports.
+@st.cache_resource
+def get_parse_executor():
+    return ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+# Parse an export in a worker process, parsing inline if the worker could not run
+def _parse_in_worker(raw):
+    try:
+        return load_chat_in_worker(raw)
+    except (subprocess.CalledProcessError, OSError):
+        return load_chat(raw)
+
+# Function to cache data. Sessions hold handles into the shared registry, so the
+# same export is parsed and stored once across all sessions. Uploads not yet in the
+# registry are parsed concurrently; handles for files no longer uploaded are released.
+def load_and_cache_chats(uploaded_files):
+    registry = get_chat_registry()
+    uploads = {}
+    for uploaded_file in uploaded_files:
+        raw = uploaded_file.getvalue()
+        uploads.setdefault(fingerprint(raw), (uploaded_file.name, raw))
+
+    held = dict(st.session_state.get('chats', {}))
+    new = [key for key in uploads if key not in held]
+    acquiring = {}
+    if sum(key not in registry for key in new) > 1:
+        acquiring = {
+            key: get_parse_executor().submit(registry.acquire, key, partial(_parse_in_worker, uploads[key][1]))
+            for key in new
+        }
+
+    chats = {}
+    for key, (name, raw) in uploads.items():
+        if key in held:
+            chats[key] = held.pop(key)
+            continue
+        try:
+            if key in acquiring:
+                chats[key] = acquiring[key].result()
+            else:
+                chats[key] = registry.acquire(key, partial(load_chat, raw))
+        except READ_ERRORS as e:
+            st.error(f"Couldn't read {name}: {e}")
+    for chat in held.values():
+        chat.release()
+    st.session_state.chats = chats
+
+    # Label each chat by file name, disambiguating repeated names
+    labelled = []
+    for key, chat in chats.items():
+        name = uploads[key][0]
+        taken = [label for label, _ in labelled]
+        labelled.append((name if name not in taken else f"{name} ({len(taken)})", chat))
+    return labelled
+
+# Compressed snapshot of a loaded chat for download
+def build_snapshot(chat):
+    return write_snapshot(chat.data, compression='zstd')
+
+# Single-upload variant of load_and_cache_chats
 def load_and_cache_data(uploaded_file):
-    if 'df' not in st.session_state:
-        text = uploaded_file.getvalue().decode('utf-8')
-        df, unmatched_lines, sender_distribution = parse_chat(text)
-        st.session_state.df = df
-        st.session_state.unmatched_lines = unmatched_lines
-    return st.session_state.df
+    chats = load_and_cache_chats([uploaded_file])
+    return chats[0][1] if chats else None
@@ -0,0 +1,54 @@
+"""
+Whatalyze analysis core: parsing, filtering and aggregation of WhatsApp chat
+exports. Nothing here imports a UI toolkit; emoji and wordcloud are imported
+on first use so worker processes (python -m whatalyze.worker) and batch jobs
+start quickly.
+"""
+
+from .analysis import analyze_chat, count_words, create_wordcloud, filter_chat, merge_analyses
+from .emojis import build_emoji_matrix, extract_emojis, filter_emojis, get_emoji_pattern
+from .loader import READ_ERRORS, load_chat, load_chat_in_worker, open_chat, read_chat_text
+from .media import find_attachments, index_media, media_by_sender
+from .parsing import TimestampFormat, parse_chat
+from .profiles import SenderProfiles
+from .registry import ChatHandle, ChatRegistry, fingerprint
+from .rollups import RollupStore
+from .search import SearchIndex, hits_timeline, search_chat, search_messages
+from .sketches import FrequentItems, HyperLogLog, reservoir_sample
+from .snapshot import load_snapshot, write_snapshot
+
+__all__ = [
+    'ChatHandle',
+    'ChatRegistry',
+    'FrequentItems',
+    'HyperLogLog',
+    'READ_ERRORS',
+    'RollupStore',
+    'SearchIndex',
+    'SenderProfiles',
+    'TimestampFormat',
+    'analyze_chat',
+    'build_emoji_matrix',
+    'count_words',
+    'create_wordcloud',
+    'extract_emojis',
+    'filter_chat',
+    'filter_emojis',
+    'find_attachments',
+    'fingerprint',
+    'get_emoji_pattern',
+    'hits_timeline',
+    'index_media',
+    'load_chat',
+    'load_chat_in_worker',
+    'load_snapshot',
+    'media_by_sender',
+    'merge_analyses',
+    'open_chat',
+    'parse_chat',
+    'read_chat_text',
+    'reservoir_sample',
+    'search_chat',
+    'search_messages',
+    'write_snapshot'
+]
@@ -0,0 +1,45 @@
+import argparse
+
+from . import READ_ERRORS, analyze_chat, load_chat, media_by_sender, write_snapshot
+
+
+# Headless summary of a chat export: python -m whatalyze chat.txt
+# With --snapshot out.zip the parsed chat and its analysis are saved for reuse.
+def main():
+    parser = argparse.ArgumentParser(prog='whatalyze', description="Summarize a WhatsApp chat export.")
+    parser.add_argument('path', help="exported chat (.txt, .zip exported with media, or a snapshot)")
+    parser.add_argument('--snapshot', metavar='OUT', help="also save a snapshot of the chat to OUT")
+    args = parser.parse_args()
+
+    try:
+        chat = load_chat(args.path)
+    except READ_ERRORS as e:
+        parser.exit(1, f"Couldn't read {args.path}: {e}\n")
+    df = chat['df']
+    if len(df) == 0:
+        parser.exit(1, "No messages found in the file. Please check the format.\n")
+
+    # Snapshots carry the analysis of the whole chat
+    analysis = chat.get('analysis') or \
+        analyze_chat(df, chat['emoji_data'], rollups=chat['rollups'], profiles=chat['profiles'])
+    print(f"Total Messages: {analysis['total_messages']}")
+    print(f"Total Days: {analysis['total_days']}")
+    print(f"Avg Messages/Day: {analysis['avg_messages_per_day']:.1f}")
+    print(f"Unparsed Lines: {chat['unmatched_lines']}")
+    print("\nTop Senders:")
+    print(analysis['messages_by_sender'].head(10).to_string())
+    print("\nTop Emojis:")
+    for emoji_label, count in analysis['most_common_emojis']:
+        print(f"{emoji_label} {count}")
+    if len(chat['attachments']):
+        print("\nMedia by Sender:")
+        print(media_by_sender(chat['attachments']).head(10).to_string())
+
+    if args.snapshot:
+        with open(args.snapshot, 'wb') as f:
+            write_snapshot(chat, f, analysis=analysis)
+        print(f"\nSnapshot saved to {args.snapshot}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+
+from .emojis import extract_emojis
+from .rollups import RollupStore
+from .sketches import CHUNK_SIZE, Z_95, FrequentItems, HyperLogLog, reservoir_sample
+
+SAMPLE_SIZE = 50_000
+
+
+# Function to filter chat messages based on sender and date range. With the chat's
+# SenderProfiles, a sender's rows are taken by position instead of comparing every row.
+def filter_chat(df, sender=None, start_date=None, end_date=None, profiles=None):
+    if sender and profiles is not None:
+        df = df.iloc[profiles.rows(sender)]
+    elif sender:
+        df = df[df['sender'] == sender]
+    if start_date:
+        df = df[df['date'] >= pd.to_datetime(start_date).date()]
+    if end_date:
+        df = df[df['date'] <= pd.to_datetime(end_date).date()]
+    return df
+
+
+# Messages per date, hour of day and weekday. A rollup store narrowed to the
+# same view answers these from its buckets instead of grouping every row.
+def _time_buckets(df, rollups=None):
+    if rollups is None:
+        return (
+            df.groupby('date').size(),
+            df.groupby(df['datetime'].dt.hour.rename('hour')).size(),
+            df.groupby(df['datetime'].dt.day_name().rename('weekday')).size()
+        )
+    messages_by_date = rollups.series('day')
+    messages_by_date.index = messages_by_date.index.date
+    return messages_by_date.rename_axis('date'), rollups.by_hour(), rollups.by_weekday()
+
+
+# Function to analyze the chat data. The frame is never modified, so shared frames are safe to pass.
+# With approximate=True, sender and emoji tallies come from mergeable sketches and word
+# statistics from a reservoir sample; 'error_bounds' then holds the ~95% bound of each estimate.
+# Pass the chat's RollupStore narrowed to the same view as rollups to read
+# time buckets, sender counts and word totals from it instead of the rows;
+# in approximate mode those are then exact, with zero error bounds.
+# When df is the whole chat, its SenderProfiles give exact sender counts as well.
+def analyze_chat(df, emoji_data=None, approximate=False, sample_size=SAMPLE_SIZE, rollups=None,
+                 profiles=None):
+    if approximate:
+        return _analyze_chat_approximate(df, emoji_data, sample_size, rollups, profiles)
+
+    total_messages = len(df)
+    if rollups is None:
+        total_days = (df['date'].max() - df['date'].min()).days
+        messages_by_sender = df['sender'].value_counts()
+        words_per_message = df['message'].str.count(r'\S+').mean()
+    else:
+        # Sender and word totals come from the rollups' coarsest buckets
+        total_days = rollups.total_days()
+        totals = rollups.totals()
+        messages_by_sender = totals['messages'].rename('count')
+        words_per_message = totals['words'].sum() / total_messages if total_messages else np.nan
+    if profiles is not None:
+        messages_by_sender = profiles.table['messages'].rename('count')
+    avg_messages_per_day = total_messages / total_days if total_days > 0 else 0
+
+    # Messages by date, hour and weekday
+    messages_by_date, messages_by_hour, messages_by_weekday = _time_buckets(df, rollups)
+
+    # Emoji analysis, read from the sender x emoji matrix built at parse time
+    if emoji_data is None:
+        emoji_data = extract_emojis(df)
+    emoji_matrix = emoji_data[1]
+    emoji_counts = emoji_matrix.sum().sort_values(ascending=False)
+    most_common_emojis = [(e, int(c)) for e, c in emoji_counts[emoji_counts > 0].head(10).items()]
+
+    return {
+        'total_messages': total_messages,
+        'total_days': total_days,
+        'avg_messages_per_day': avg_messages_per_day,
+        'distinct_senders': len(messages_by_sender),
+        'messages_by_sender': messages_by_sender,
+        'messages_by_date': messages_by_date,
+        'messages_by_hour': messages_by_hour,
+        'messages_by_weekday': messages_by_weekday,
+        'words_per_message': words_per_message,
+        'most_common_emojis': most_common_emojis,
+        'emoji_counts': emoji_counts,
+        'emoji_matrix': emoji_matrix,
+        'sender_sketch': None,
+        'sample': None,
+        'rollups': rollups,
+        'profiles': profiles,
+        'approximate': False,
+        'error_bounds': {}
+    }
+
+
+def _analyze_chat_approximate(df, emoji_data, sample_size, rollups=None, profiles=None):
+    total_messages = len(df)
+    total_days = (df['date'].max() - df['date'].min()).days if rollups is None else rollups.total_days()
+    avg_messages_per_day = total_messages / total_days if total_days > 0 else 0
+
+    # Time buckets are cheap vectorized group-bys and stay exact
+    messages_by_date, messages_by_hour, messages_by_weekday = _time_buckets(df, rollups)
+
+    # Sender counts are exact when the profiles or rollups hold them. Otherwise senders
+    # are counted a chunk at a time: a single chunk is the exact answer, and only counts
+    # spanning several chunks go through the sketches, which see each chunk's distinct
+    # senders rather than every row.
+    totals = rollups.totals() if rollups is not None else None
+    if profiles is not None or totals is not None or len(df) <= CHUNK_SIZE:
+        if profiles is not None:
+            messages_by_sender = profiles.table['messages'].rename('count')
+        elif totals is not None:
+            messages_by_sender = totals['messages'].rename('count')
+        else:
+            messages_by_sender = df['sender'].value_counts()
+        distinct = HyperLogLog().add(messages_by_sender.index)
+        distinct_senders = len(messages_by_sender)
+        distinct_error = 0.0
+        senders_error = 0
+    else:
+        distinct = HyperLogLog()
+        senders = FrequentItems()
+        for start in range(0, len(df), CHUNK_SIZE):
+            counts = df['sender'].iloc[start:start + CHUNK_SIZE].value_counts()
+            distinct.add(counts.index)
+            senders.add_counts(counts)
+        messages_by_sender = senders.counts.rename('count').rename_axis('sender')
+        distinct_senders = int(round(distinct.estimate()))
+        distinct_error = float(Z_95 * distinct.relative_error * distinct.estimate())
+        senders_error = senders.error
+
+    # Emoji tallies; the parse-time matrix is already exact, otherwise sketch chunk by chunk
+    if emoji_data is not None:
+        emoji_matrix = emoji_data[1]
+        emoji_counts = emoji_matrix.sum().sort_values(ascending=False)
+        emoji_error = 0
+    else:
+        emojis = FrequentItems()
+        for start in range(0, len(df), CHUNK_SIZE):
+            emojis.add(extract_emojis(df.iloc[start:start + CHUNK_SIZE])[0]['emoji'])
+        emoji_matrix = pd.DataFrame(dtype=pd.SparseDtype('int64', 0))
+        emoji_counts = emojis.counts
+        emoji_error = emojis.error
+    most_common_emojis = [(e, int(c)) for e, c in emoji_counts[emoji_counts > 0].head(10).items()]
+
+    # The word cloud reads a uniform sample of messages, and so do word statistics
+    # unless the rollups already sum the words exactly
+    sample = reservoir_sample(df, sample_size)
+    if totals is not None:
+        words_per_message = totals['words'].sum() / total_messages if total_messages else np.nan
+        words_error = 0.0
+    else:
+        word_counts = sample['message'].str.count(r'\S+')
+        words_per_message = word_counts.mean()
+        words_error = Z_95 * word_counts.std() / np.sqrt(len(sample)) if len(sample) < total_messages else 0.0
+
+    return {
+        'total_messages': total_messages,
+        'total_days': total_days,
+        'avg_messages_per_day': avg_messages_per_day,
+        'distinct_senders': distinct_senders,
+        'messages_by_sender': messages_by_sender,
+        'messages_by_date': messages_by_date,
+        'messages_by_hour': messages_by_hour,
+        'messages_by_weekday': messages_by_weekday,
+        'words_per_message': words_per_message,
+        'most_common_emojis': most_common_emojis,
+        'emoji_counts': emoji_counts,
+        'emoji_matrix': emoji_matrix,
+        'sender_sketch': distinct,
+        'sample': sample,
+        'rollups': rollups,
+        'profiles': profiles,
+        'approximate': True,
+        'error_bounds': {
+            'distinct_senders': distinct_error,
+            'messages_by_sender': senders_error,
+            'most_common_emojis': emoji_error,
+            'words_per_message': float(words_error)
+        }
+    }
+
+
+# Sum count Series from several analyses, aligning on their index
+def _add_counts(series):
+    series = [s for s in series if len(s)]
+    if not series:
+        return pd.Series(dtype='int64')
+    total = series[0]
+    for s in series[1:]:
+        total = total.add(s, fill_value=0)
+    return total.astype('int64')
+
+
+# Combine the analyses of several chats into one, using only their mergeable
+# aggregates: counts add, sender sketches merge and samples are drawn in
+# proportion to each chat's size. No message tables are concatenated.
+def merge_analyses(analyses, sample_size=SAMPLE_SIZE):
+    analyses = [a for a in analyses if a['total_messages']]
+    total_messages = sum(a['total_messages'] for a in analyses)
+    messages_by_date = _add_counts([a['messages_by_date'] for a in analyses]).sort_index()
+    total_days = (messages_by_date.index.max() - messages_by_date.index.min()).days if total_messages else 0
+    avg_messages_per_day = total_messages / total_days if total_days > 0 else 0
+
+    messages_by_sender = _add_counts([a['messages_by_sender'] for a in analyses])
+    messages_by_sender = messages_by_sender.sort_values(ascending=False).rename('count').rename_axis('sender')
+    emoji_counts = _add_counts([a['emoji_counts'] for a in analyses]).sort_values(ascending=False)
+    most_common_emojis = [(e, int(c)) for e, c in emoji_counts[emoji_counts > 0].head(10).items()]
+    matrices = [a['emoji_matrix'].sparse.to_dense() for a in analyses if len(a['emoji_matrix'])]
+    emoji_matrix = (pd.concat(matrices).fillna(0).groupby(level=0).sum().astype('int64')
+                    if matrices else pd.DataFrame(dtype='int64')).astype(pd.SparseDtype('int64', 0))
+
+    words_per_message = (sum(a['words_per_message'] * a['total_messages'] for a in analyses) / total_messages
+                         if total_messages else np.nan)
+
+    rollups = [a['rollups'] for a in analyses]
+    merged = {
+        'total_messages': total_messages,
+        'total_days': total_days,
+        'avg_messages_per_day': avg_messages_per_day,
+        # Exact per-chat sender counts already name every sender
+        'distinct_senders': len(messages_by_sender),
+        'messages_by_sender': messages_by_sender,
+        'messages_by_date': messages_by_date,
+        'messages_by_hour': _add_counts([a['messages_by_hour'] for a in analyses]).sort_index(),
+        'messages_by_weekday': _add_counts([a['messages_by_weekday'] for a in analyses]),
+        'words_per_message': words_per_message,
+        'most_common_emojis': most_common_emojis,
+        'emoji_counts': emoji_counts,
+        'emoji_matrix': emoji_matrix,
+        'sender_sketch': None,
+        'sample': None,
+        'rollups': RollupStore.combine(rollups) if rollups and None not in rollups else None,
+        'profiles': None,
+        'approximate': False,
+        'error_bounds': {}
+    }
+    if not any(a['approximate'] for a in analyses):
+        return merged
+
+    samples = [
+        reservoir_sample(a['sample'], max(1, round(sample_size * a['total_messages'] / total_messages)))
+        for a in analyses if a['sample'] is not None
+    ]
+    bounds = [a['error_bounds'] for a in analyses]
+    merged.update({
+        'sample': pd.concat(samples, ignore_index=True),
+        'approximate': True,
+        'error_bounds': {
+            'distinct_senders': 0.0,
+            'messages_by_sender': sum(b.get('messages_by_sender', 0) for b in bounds),
+            'most_common_emojis': sum(b.get('most_common_emojis', 0) for b in bounds),
+            'words_per_message': max((b.get('words_per_message', 0.0) for b in bounds), default=0.0)
+        }
+    })
+    # Distinct senders come from the merged sketches only when some analysis kept just its
+    # top senders; complete sender counts already give the exact number
+    if merged['error_bounds']['messages_by_sender']:
+        distinct = HyperLogLog()
+        for a in analyses:
+            distinct.merge(a['sender_sketch'] or HyperLogLog().add(a['messages_by_sender'].index))
+        merged['distinct_senders'] = int(round(distinct.estimate()))
+        merged['sender_sketch'] = distinct
+        merged['error_bounds']['distinct_senders'] = float(Z_95 * distinct.relative_error * distinct.estimate())
+    return merged
+
+
+# Word frequencies over all messages, case-folded, most frequent first
+def count_words(df):
+    words = df['message'].astype(str).str.casefold().str.findall(r'\w+').explode().dropna()
+    return words.value_counts().rename('count').rename_axis('word')
+
+
+# Create a word cloud from the chat messages
+def create_wordcloud(df):
+    from wordcloud import WordCloud
+
+    all_messages = ' '.join(df['message'].astype(str))
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(all_messages)
+    return wordcloud
@@ -0,0 +1,75 @@
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+
+# Build one regex character class from a set of code points, collapsing runs into ranges
+def _char_class(codepoints):
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return '[' + ''.join(
+        re.escape(chr(start)) if start == end else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+        for start, end in ranges
+    ) + ']'
+
+
+# Grapheme-aware emoji regex, compiled once. Skin tones, ZWJ families, keycaps,
+# flags and subdivision flags match as a single emoji instead of being split apart.
+@lru_cache(maxsize=None)
+def get_emoji_pattern():
+    import emoji
+
+    keycap_bases = {ord(c) for c in '0123456789#*'}
+    bases = {ord(e[0]) for e in emoji.EMOJI_DATA if len(e) == 1 or e[1] == '\ufe0f'} - keycap_bases
+    regional_indicators = set(range(0x1F1E6, 0x1F200))
+    base = _char_class(bases)
+    modifiers = r'(?:\ufe0f|[\U0001F3FB-\U0001F3FF])*'
+    pattern = (
+        # Cheap guard so plain letters never reach the large emoji class
+        r'(?=[#*0-9\xa9-\U0010FFFF])'
+        + _char_class(bases | regional_indicators | keycap_bases)
+        + '(?:'
+        + r'(?<=[\U0001F1E6-\U0001F1FF])[\U0001F1E6-\U0001F1FF]'  # flags
+        + r'|(?<=[0-9#*])\ufe0f?\u20e3'  # keycaps
+        + r'|(?<=\U0001F3F4)[\U000E0020-\U000E007E]+\U000E007F'  # subdivision flags
+        + '|(?<=' + base + ')' + modifiers + r'(?:\u200d' + base + modifiers + ')*'  # ZWJ sequences
+        + ')'
+    )
+    return re.compile(pattern)
+
+
+# Build the sparse sender x emoji count matrix from emoji occurrences
+def build_emoji_matrix(emojis):
+    counts = emojis.groupby(['sender', 'emoji'], observed=True).size()
+    emoji_matrix = counts.unstack(fill_value=0) if len(counts) else pd.DataFrame(dtype='int64')
+    return emoji_matrix.astype(pd.SparseDtype('int64', 0))
+
+
+# Extract every emoji once at parse time, vectorized over the message column
+def extract_emojis(df):
+    messages = df['message'].astype(str)
+    # Emoji always contain a non-ASCII code point, so ASCII-only messages are skipped
+    candidates = messages[~messages.map(str.isascii).astype(bool)]
+    found = candidates.str.findall(get_emoji_pattern()).explode().dropna()
+    emojis = pd.DataFrame({
+        'sender': df.loc[found.index, 'sender'].astype('category'),
+        'emoji': found.astype('category')
+    })
+    return emojis, build_emoji_matrix(emojis)
+
+
+# Narrow the parse-time emoji data to a sender and/or the rows of a filtered frame
+def filter_emojis(emoji_data, sender=None, df=None):
+    emojis, emoji_matrix = emoji_data
+    if sender:
+        emojis = emojis[emojis['sender'] == sender]
+        emoji_matrix = emoji_matrix.loc[emoji_matrix.index == sender]
+    if df is not None:
+        emojis = emojis[emojis.index.isin(df.index)]
+        emoji_matrix = build_emoji_matrix(emojis)
+    return emojis, emoji_matrix
@@ -0,0 +1,126 @@
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+
+from .emojis import extract_emojis
+from .media import find_attachments, index_media, match_media
+from .parsing import parse_chat
+from .profiles import SenderProfiles
+from .rollups import RollupStore
+from .search import SearchIndex
+from .snapshot import load_snapshot, read_manifest
+
+# Errors raised for an upload that can't be read: undecodable text, a broken zip
+# or deflate stream, or a damaged snapshot (pyarrow's ArrowInvalid is a ValueError)
+READ_ERRORS = (ValueError, zipfile.BadZipFile, zlib.error, EOFError)
+
+# Exit status of a parse worker whose export could not be read; its stderr holds the reason
+UNREADABLE = 3
+
+# Directory holding the whatalyze package, so workers import it wherever the caller runs
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Name of the chat text member of an export zip. iOS names it _chat.txt;
+# Android uses "WhatsApp Chat with <name>.txt".
+def find_chat_member(archive):
+    names = [name for name in archive.namelist() if name.lower().endswith('.txt')]
+    if not names:
+        raise ValueError("No chat text file (.txt) found in the zip archive.")
+    return next((n for n in names if n.rsplit('/', 1)[-1] == '_chat.txt'), names[0])
+
+
+# Open an export (raw bytes or a file path) as a stream of decoded text lines,
+# along with the media index of a zip export (None for a plain .txt).
+# Zip members are decompressed and decoded incrementally as lines are read;
+# attachments are only listed from the archive directory.
+@contextmanager
+def open_chat(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        source = open(source, 'rb')
+    with source:
+        if not zipfile.is_zipfile(source):
+            source.seek(0)
+            with io.TextIOWrapper(source, encoding='utf-8-sig') as lines:
+                yield lines, None
+            return
+        with zipfile.ZipFile(source) as archive:
+            member = find_chat_member(archive)
+            media_index = index_media(archive, chat_member=member)
+            with io.TextIOWrapper(archive.open(member), encoding='utf-8-sig') as lines:
+                yield lines, media_index
+
+
+# Full text of an export's chat, for callers that want the plain string
+def read_chat_text(source):
+    with open_chat(source) as (lines, media_index):
+        return lines.read()
+
+
+# Parse an export and derive everything the dashboard reads from it.
+# Snapshots written by write_snapshot are loaded as they are, without parsing.
+def load_chat(source):
+    if read_manifest(source) is not None:
+        return load_snapshot(source)
+    with open_chat(source) as (lines, media_index):
+        df, unmatched_lines, sender_distribution = parse_chat(lines)
+    emoji_data = extract_emojis(df)
+    rollups = RollupStore.build(df)
+    return {
+        'df': df,
+        'unmatched_lines': unmatched_lines,
+        'emoji_data': emoji_data,
+        'search_index': SearchIndex.build(df['message']),
+        'rollups': rollups,
+        'profiles': SenderProfiles.build(df, emoji_data, rollups),
+        'media_index': media_index,
+        'attachments': find_attachments(df, media_index)
+    }
+
+
+# Chat text of an export as a file the worker can parse: a plain .txt path is
+# used in place; otherwise only the chat text (the chat member of a zip) is
+# streamed into directory, leaving the media in the upload.
+def _write_chat_text(source, directory):
+    if isinstance(source, (str, os.PathLike)) and not zipfile.is_zipfile(source):
+        return os.path.abspath(source), None
+    export = os.path.join(directory, 'chat.txt')
+    with open_chat(source) as (lines, media_index), \
+            open(export, 'w', encoding='utf-8', newline='') as f:
+        shutil.copyfileobj(lines, f)
+    return export, media_index
+
+
+# load_chat in a separate Python process (python -m whatalyze.worker) that
+# imports only the whatalyze core. The worker is given just the chat text and
+# returns an uncompressed snapshot, which is memory-mapped rather than read or
+# unpickled; attachment sizes are then matched against the zip's media index
+# here. Unreadable exports raise one of READ_ERRORS (ValueError from the
+# worker); a worker that fails otherwise raises subprocess.CalledProcessError.
+def load_chat_in_worker(source):
+    if read_manifest(source) is not None:
+        return load_snapshot(source)
+    # A mapped snapshot can't be removed on Windows; it is left to the temp cleanup there
+    with tempfile.TemporaryDirectory(prefix='whatalyze-', ignore_cleanup_errors=True) as tmp:
+        export, media_index = _write_chat_text(source, tmp)
+        snapshot = os.path.join(tmp, 'chat.snapshot.zip')
+
+        result = subprocess.run([sys.executable, '-m', 'whatalyze.worker', export, snapshot],
+                                cwd=PACKAGE_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True)
+        if result.returncode == UNREADABLE:
+            raise ValueError(result.stderr.strip())
+        result.check_returncode()
+        chat = load_snapshot(snapshot)
+    if media_index is not None:
+        chat['media_index'] = media_index
+        chat['attachments'] = match_media(chat['attachments'], media_index)
+    return chat
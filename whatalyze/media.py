@@ -0,0 +1,83 @@
+import mimetypes
+import re
+
+import pandas as pd
+
+# Attachment markers in message text:
+#   <attached: 00000012-PHOTO-2023-01-01-12-00-00.jpg>   (iOS)
+#   IMG-20230101-WA0001.jpg (file attached)              (Android)
+#   <Media omitted>                                      (exported without media)
+ATTACHMENT_PATTERN = re.compile(
+    r'<attached:\s*([^>]+?)\s*>|^\W*(\S[^\n]*?) \(file attached\)|<(Media omitted)>'
+)
+
+MEDIA_COLUMNS = ['name', 'size', 'compressed_size', 'type']
+ATTACHMENT_COLUMNS = ['sender', 'name', 'omitted', 'size', 'type']
+
+
+# Coarse media type of a file name: image, video, audio, sticker or document
+def media_type(name):
+    if name.lower().endswith('.webp'):
+        return 'sticker'
+    mime, _ = mimetypes.guess_type(name)
+    major = mime.split('/')[0] if mime else None
+    return major if major in ('image', 'video', 'audio') else 'document'
+
+
+# Name, size and type of every attachment in an export zip, read from the
+# archive directory only; no member is decompressed
+def index_media(archive, chat_member=None):
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename != chat_member
+    ]
+    return pd.DataFrame({
+        'name': [info.filename.rsplit('/', 1)[-1] for info in members],
+        'size': pd.array([info.file_size for info in members], dtype='Int64'),
+        'compressed_size': pd.array([info.compress_size for info in members], dtype='Int64'),
+        'type': [media_type(info.filename) for info in members]
+    }, columns=MEDIA_COLUMNS)
+
+
+# One row per attachment message, indexed by message row label, with the
+# sender and the size/type of the matching file in media_index if it was exported
+def find_attachments(df, media_index=None):
+    messages = df['message'].astype(str)
+    # Plain substring checks are far cheaper than the regex, so only likely markers are matched
+    candidates = messages[
+        messages.str.contains('attached', regex=False) | messages.str.contains('<Media omitted>', regex=False)
+    ]
+    found = candidates.str.extract(ATTACHMENT_PATTERN).dropna(how='all')
+    names = found[0].fillna(found[1])
+    attachments = pd.DataFrame({
+        'sender': df.loc[found.index, 'sender'],
+        'name': names,
+        'omitted': found[2].notna()
+    }, index=found.index)
+    attachments['type'] = attachments['name'].map(media_type, na_action='ignore')
+    return match_media(attachments, media_index)
+
+
+# Attachments with the size of each file taken from media_index (missing
+# files, or no index at all, leave it empty)
+def match_media(attachments, media_index=None):
+    sizes = pd.Series(dtype='Int64') if media_index is None else \
+        media_index.drop_duplicates('name').set_index('name')['size']
+    size = attachments['name'].map(sizes).astype('Int64')
+    return attachments.assign(size=size)[ATTACHMENT_COLUMNS]
+
+
+# Media files and bytes per sender. Files referenced in the chat but not
+# included in the export are counted as missing.
+def media_by_sender(attachments):
+    if len(attachments) == 0:
+        return pd.DataFrame(columns=['files', 'bytes', 'missing'], dtype='int64')
+    found = attachments['size'].notna()
+    table = pd.DataFrame({
+        'files': attachments.groupby('sender', observed=True).size(),
+        'bytes': attachments['size'].fillna(0).groupby(attachments['sender'], observed=True).sum(),
+        'missing': (~found).groupby(attachments['sender'], observed=True).sum()
+    })
+    types = attachments[found].groupby(['sender', 'type'], observed=True).size().unstack(fill_value=0)
+    table = table.join(types).fillna(0).astype('int64')
+    return table.sort_values('files', ascending=False)
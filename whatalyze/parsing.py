@@ -0,0 +1,149 @@
+import re
+from datetime import datetime
+from itertools import chain
+
+import pandas as pd
+
+# One header pattern for every export flavour:
+#   [dd/mm/yy, HH:MM:SS] Sender: message        (iOS)
+#   dd/mm/yy, HH:MM AM/PM - Sender: message     (Android)
+# Groups: the two date fields (day/month in either order), year, hour, minute,
+# optional second, optional AM/PM letter, optional sender and the message.
+# System lines carry a timestamp but no "Sender: " part.
+HEADER_PATTERN = re.compile(
+    r'\[?(\d{1,2})/(\d{1,2})/(\d{4}|\d{2}),?\s*'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\s*([APap])\.?\s*[Mm]\.?)?\]?'
+    r'\s*(?:-\s*)?(?:(.+?):\s)?(.*)'
+)
+
+COLUMNS = ['datetime', 'date', 'time', 'sender', 'message']
+
+
+class TimestampFormat:
+    """
+    Date order, year width and clock of a chat's timestamps.
+
+    Exports use one format throughout, so it is inferred once from the header
+    lines and every timestamp is then decoded the same way. Lines with another
+    year width, clock or date order are not headers (e.g. "12/25/2023, 10:00 -
+    departs JFK" pasted into a day-first chat) and continue the message; only
+    contradicting dates among the lines the format is inferred from raise a
+    ValueError.
+    """
+
+    def __init__(self, day_first=True, four_digit_year=False, twelve_hour=False):
+        self.day_first = day_first
+        self.four_digit_year = four_digit_year
+        self.twelve_hour = twelve_hour
+
+    # Format of a sample of header matches. A field above 12 can only be the day
+    # and settles the date order. Without one, the order under which the dates
+    # run most chronologically wins, and day-first on a tie.
+    @classmethod
+    def infer(cls, headers, day_first=None):
+        if not headers:
+            return cls(day_first=day_first is not False)
+        first = headers[0]
+        fmt = cls(four_digit_year=len(first.group(3)) == 4, twelve_hour=first.group(7) is not None)
+
+        fields = [(int(m.group(1)), int(m.group(2)), int(m.group(3))) for m in headers]
+        if day_first is None:
+            day_evidence = any(a > 12 for a, b, y in fields)
+            month_evidence = any(b > 12 for a, b, y in fields)
+            if day_evidence and month_evidence:
+                raise ValueError("Conflicting date order: the chat has dates with the day first "
+                                 "and dates with the month first.")
+            if day_evidence or month_evidence:
+                day_first = day_evidence
+            else:
+                day_first = (_backsteps([(y, b, a) for a, b, y in fields])
+                             <= _backsteps([(y, a, b) for a, b, y in fields]))
+        fmt.day_first = day_first
+        return fmt
+
+    # Datetime of a header match, or None if it is not a timestamp in this format
+    # (a date in the other order fails as an invalid date)
+    def decode(self, match):
+        first, second, year, hour, minute, seconds, meridiem = match.groups()[:7]
+        if (len(year) == 4) != self.four_digit_year or (meridiem is not None) != self.twelve_hour:
+            return None
+
+        day, month = (int(first), int(second)) if self.day_first else (int(second), int(first))
+        hour = int(hour)
+        if meridiem is not None:
+            hour = hour % 12 + (12 if meridiem in 'Pp' else 0)
+        year = int(year) if self.four_digit_year else 2000 + int(year)
+        try:
+            return datetime(year, month, day, hour, int(minute), int(seconds or 0))
+        except ValueError:
+            return None
+
+
+# Number of times a sequence of sortable keys steps backwards
+def _backsteps(keys):
+    return sum(later < earlier for earlier, later in zip(keys, keys[1:]))
+
+
+# Read lines until the date order is settled (or the input ends), infer the
+# timestamp format from the headers seen, and return it with all the lines
+def infer_timestamp_format(lines, day_first=None):
+    lines = iter(lines)
+    buffered = []
+    headers = []
+    for line in lines:
+        buffered.append(line)
+        match = HEADER_PATTERN.match(line.strip().lstrip('\u200e'))
+        if match:
+            headers.append(match)
+            if day_first is not None or int(match.group(1)) > 12 or int(match.group(2)) > 12:
+                break
+    return TimestampFormat.infer(headers, day_first), chain(buffered, lines)
+
+
+# Function to parse chat messages from a string or any iterable of lines,
+# such as an open text stream, which is then read incrementally.
+# The timestamp format is inferred once up front; day_first forces the date order.
+def parse_chat(text, day_first=None):
+    lines = text.split('\n') if isinstance(text, str) else text
+    timestamp_format, lines = infer_timestamp_format(lines, day_first)
+
+    stamps = []
+    senders = []
+    messages = []
+    unmatched_lines = 0
+
+    for line in lines:
+        line = line.strip().lstrip('\u200e')
+        if not line:
+            continue
+
+        match = HEADER_PATTERN.match(line)
+        dt = timestamp_format.decode(match) if match else None
+
+        if dt and match.group(8):
+            stamps.append(dt)
+            senders.append(match.group(8).strip())
+            messages.append(match.group(9).strip())
+        elif dt:
+            # Timestamped system line (joins, encryption notice, ...) without a sender
+            unmatched_lines += 1
+        elif messages:
+            # Continuation of previous message
+            messages[-1] += '\n' + line
+        else:
+            unmatched_lines += 1
+
+    stamps = pd.Series(pd.to_datetime(stamps), dtype='datetime64[us]')
+    df = pd.DataFrame({
+        'datetime': stamps,
+        'date': stamps.dt.date,
+        'time': stamps.dt.time,
+        'sender': pd.Series(senders, dtype=str),
+        'message': pd.Series(messages, dtype=str)
+    }, columns=COLUMNS)
+    df = df.sort_values(by='datetime', kind='stable').reset_index(drop=True)
+
+    # Calculate distribution by sender
+    sender_distribution = df['sender'].value_counts()
+
+    return df, unmatched_lines, sender_distribution
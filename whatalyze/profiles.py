@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+PROFILE_COLUMNS = [
+    'messages', 'words', 'emojis', 'share', 'first_seen', 'last_seen', 'peak_hour', 'rows_start', 'rows_stop'
+]
+
+
+class SenderProfiles:
+    """
+    Per-sender totals of a chat, built once at parse time.
+
+    `table` is indexed by sender, most active first, and holds message, word
+    and emoji totals, the share of all messages in percent, first/last seen
+    times and the busiest hour. `hours` is the sender x hour-of-day message
+    histogram. The row positions of a sender's messages are
+    positions[rows_start:rows_stop], ascending, so a sender filter never
+    scans the message table.
+    """
+
+    def __init__(self, table, hours, positions):
+        self.table = table
+        self.hours = hours
+        self.positions = positions
+
+    @classmethod
+    def build(cls, df, emoji_data=None, rollups=None):
+        codes, senders = pd.factorize(df['sender'])
+        n_senders = len(senders)
+        positions = np.argsort(codes, kind='stable')
+        messages = np.bincount(codes, minlength=n_senders)
+        stops = np.cumsum(messages)
+        starts = stops - messages
+
+        hours = np.bincount(codes * 24 + df['datetime'].dt.hour.to_numpy(), minlength=n_senders * 24)
+        hours = pd.DataFrame(hours.reshape(n_senders, 24), index=pd.Index(senders, name='sender'))
+        hours.columns.name = 'hour'
+
+        # Word totals are already summed in the rollups; otherwise count them here
+        if rollups is not None:
+            words = rollups.totals()['words'].reindex(senders, fill_value=0).to_numpy()
+        else:
+            word_counts = df['message'].astype(str).str.count(r'\S+').to_numpy()
+            words = np.bincount(codes, weights=word_counts, minlength=n_senders).astype('int64')
+        if emoji_data is None:
+            emojis = np.zeros(n_senders, dtype='int64')
+        else:
+            emojis = emoji_data[1].sum(axis=1).reindex(senders, fill_value=0).to_numpy(dtype='int64')
+
+        # The message table is sorted by time, so a sender's first and last rows bound their activity
+        times = df['datetime'].to_numpy()
+        table = pd.DataFrame({
+            'messages': messages,
+            'words': words,
+            'emojis': emojis,
+            'share': messages / max(len(df), 1) * 100,
+            'first_seen': times[positions[starts]] if len(df) else times[:0],
+            'last_seen': times[positions[stops - 1]] if len(df) else times[:0],
+            'peak_hour': hours.to_numpy().argmax(axis=1),
+            'rows_start': starts,
+            'rows_stop': stops
+        }, index=hours.index, columns=PROFILE_COLUMNS)
+        table = table.sort_values('messages', ascending=False, kind='stable')
+        return cls(table, hours.loc[table.index], positions)
+
+    @property
+    def nbytes(self):
+        return (int(self.table.memory_usage(deep=True).sum()) + int(self.hours.memory_usage().sum())
+                + self.positions.nbytes)
+
+    # Sender names, most active first
+    @property
+    def senders(self):
+        return self.table.index.tolist()
+
+    # Row positions of a sender's messages, ascending; empty for unknown senders
+    def rows(self, sender):
+        if sender not in self.table.index:
+            return self.positions[:0]
+        start, stop = self.table.loc[sender, ['rows_start', 'rows_stop']]
+        return self.positions[start:stop]
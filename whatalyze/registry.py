@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+# Fingerprint the raw export so identical uploads share one parsed chat
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Rough in-memory size of a parsed chat entry. Objects whose id is in shared
+# (e.g. those of the chat a view was computed from) are not counted again.
+def estimate_nbytes(entry, shared=frozenset()):
+    nbytes = 0
+    for value in entry.values():
+        if id(value) in shared:
+            continue
+        if hasattr(value, 'memory_usage'):
+            usage = value.memory_usage(deep=True)
+            nbytes += int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        elif hasattr(value, 'nbytes'):
+            nbytes += int(value.nbytes)
+        elif isinstance(value, tuple):
+            nbytes += estimate_nbytes(dict(enumerate(value)), shared)
+        elif isinstance(value, dict):
+            nbytes += estimate_nbytes(value, shared)
+    return nbytes
+
+
+# Ids of a chat's values and of the members of its tuple values
+def _shared_ids(data):
+    ids = set()
+    for value in data.values():
+        ids.add(id(value))
+        if isinstance(value, tuple):
+            ids.update(id(member) for member in value)
+    return ids
+
+
+class ChatRegistry:
+    """
+    Process-wide store of parsed chats keyed by content fingerprint.
+
+    Every session holding a chat owns a reference to it. Unreferenced chats
+    stay cached until the memory budget is exceeded, then the least recently
+    used ones are evicted first. A chat is parsed once even when several
+    sessions upload it at the same time: later callers wait for the first parse.
+
+    Memoized views of a chat (filtered frames and their analyses) are stored
+    in its entry, up to max_views per chat. They count against the budget,
+    are dropped before any chat still in use and are evicted with their chat.
+    """
+
+    def __init__(self, max_bytes, max_views=16):
+        self.max_bytes = max_bytes
+        self.max_views = max_views
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, loader):
+        """
+        Return a handle to the chat stored under key, parsing it with loader() on first use
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['refs'] += 1
+                self._entries.move_to_end(key)
+                return ChatHandle(self, key)
+            # Parses in progress are shared through a Future, so a key is only loaded once
+            future = self._loading.get(key)
+            loading = future is None
+            if loading:
+                future = self._loading[key] = Future()
+
+        if not loading:
+            # Raises the loader's error as well, like parsing it here would have
+            self._store(key, future.result())
+            return ChatHandle(self, key)
+
+        # Parse outside the lock so other sessions are not blocked meanwhile
+        try:
+            data = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        self._store(key, data, done=future)
+        future.set_result(data)
+        return ChatHandle(self, key)
+
+    # Take a reference to the chat under key, storing data if it is not (or no
+    # longer) stored. done is the Future of the parse that produced data.
+    def _store(self, key, data, done=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'data': data, 'nbytes': estimate_nbytes(data), 'refs': 0, 'views': OrderedDict()}
+                self._entries[key] = entry
+            if done is not None and self._loading.get(key) is done:
+                del self._loading[key]
+            entry['refs'] += 1
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def view(self, key, view_key, compute, executor=None):
+        """
+        Future of the view of the chat under key named view_key, computed with
+        compute() at most once: inline, or on executor when one is given
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and view_key in entry['views']:
+                entry['views'].move_to_end(view_key)
+                future = Future()
+                future.set_result(entry['views'][view_key][0])
+                return future
+            future = self._loading.get((key, view_key))
+            if future is not None:
+                return future
+            future = self._loading[(key, view_key)] = Future()
+
+        if executor is None:
+            self._compute_view(key, view_key, compute, future)
+        else:
+            executor.submit(self._compute_view, key, view_key, compute, future)
+        return future
+
+    # Run compute() for a view, store the result with its chat and resolve future
+    def _compute_view(self, key, view_key, compute, future):
+        try:
+            data = compute()
+        except Exception as e:
+            with self._lock:
+                del self._loading[(key, view_key)]
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            shared = _shared_ids(entry['data']) if entry is not None else set()
+        nbytes = estimate_nbytes({'view': data}, shared)
+        with self._lock:
+            del self._loading[(key, view_key)]
+            # Views of a chat evicted meanwhile are returned but not kept
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['views'][view_key] = (data, nbytes)
+                entry['nbytes'] += nbytes
+                while len(entry['views']) > self.max_views:
+                    entry['nbytes'] -= entry['views'].popitem(last=False)[1][1]
+                self._evict()
+        future.set_result(data)
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['refs'] > 0:
+                entry['refs'] -= 1
+                self._evict()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            return entry['data']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'chats': len(self._entries),
+                'nbytes': sum(e['nbytes'] for e in self._entries.values()),
+                'refs': sum(e['refs'] for e in self._entries.values()),
+                'max_bytes': self.max_bytes
+            }
+
+    # Drop least recently used, unreferenced chats until back under budget, then
+    # the oldest views of the chats still in use. Caller holds the lock.
+    def _evict(self):
+        total = sum(e['nbytes'] for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry['refs'] == 0:
+                total -= entry['nbytes']
+                del self._entries[key]
+        for entry in self._entries.values():
+            while total > self.max_bytes and entry['views']:
+                nbytes = entry['views'].popitem(last=False)[1][1]
+                entry['nbytes'] -= nbytes
+                total -= nbytes
+        if total > self.max_bytes:
+            logger.warning("Chat registry over budget: %d of %d bytes held by active sessions",
+                           total, self.max_bytes)
+
+
+class ChatHandle:
+    """
+    Lightweight per-session reference to a chat held by a ChatRegistry.
+
+    The reference is released explicitly or when the session drops the handle.
+    """
+
+    def __init__(self, registry, key):
+        self.key = key
+        self._registry = registry
+        self._finalizer = weakref.finalize(self, registry.release, key)
+
+    def release(self):
+        self._finalizer()
+
+    # Future of a memoized view of this chat; see ChatRegistry.view
+    def view(self, view_key, compute, executor=None):
+        return self._registry.view(self.key, view_key, compute, executor)
+
+    # Everything the chat's loader returned
+    @property
+    def data(self):
+        return self._registry.get(self.key)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        data = self.data
+        if name in data:
+            return data[name]
+        raise AttributeError(name)
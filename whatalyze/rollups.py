@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+LEVELS = ['hour', 'day', 'week', 'month']
+
+# Length of the fixed-size levels; months are stepped by calendar
+STEPS = {'hour': pd.Timedelta(hours=1), 'day': pd.Timedelta(days=1), 'week': pd.Timedelta(days=7)}
+
+
+# Start of the level bucket holding each timestamp; weeks start on Monday
+def _floor(buckets, level):
+    if level == 'hour':
+        return buckets.dt.floor('h')
+    days = buckets.dt.floor('D')
+    if level == 'day':
+        return days
+    if level == 'week':
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    return days.dt.to_period('M').dt.to_timestamp()
+
+
+# Start of the bucket following each level bucket
+def _next_bucket(buckets, level):
+    if level == 'month':
+        return (buckets.dt.to_period('M') + 1).dt.to_timestamp()
+    return buckets + STEPS[level]
+
+
+# Re-aggregate a finer (bucket, sender) table into level buckets
+def _rollup(table, level):
+    keys = [_floor(table['bucket'], level), table['sender']]
+    rolled = table.groupby(keys, observed=True, sort=True)[['messages', 'words']].sum()
+    return rolled.reset_index()
+
+
+# Rows of a bucket-sorted table for one sender whose bucket starts in [start, stop)
+def _slice(table, sender=None, start=None, stop=None):
+    buckets = table['bucket'].to_numpy()
+    lo = 0 if start is None else np.searchsorted(buckets, np.datetime64(start), side='left')
+    hi = len(buckets) if stop is None else np.searchsorted(buckets, np.datetime64(stop), side='left')
+    table = table.iloc[lo:hi]
+    if sender:
+        table = table[table['sender'] == sender]
+    return table
+
+
+class RollupStore:
+    """
+    Message and word counts per sender in hour, day, week and month buckets,
+    built once at parse time. Each level is a (bucket, sender, messages,
+    words) table sorted by bucket; coarser levels are rolled up from finer ones.
+
+    Filtering by date keeps whole weeks and months from their own level and
+    only re-aggregates the partial buckets at the edges of the range from days,
+    so queries read a few hundred rows however many messages the chat has.
+    """
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    @classmethod
+    def build(cls, df):
+        rows = pd.DataFrame({
+            'bucket': _floor(df['datetime'], 'hour'),
+            'sender': df['sender'].astype('category'),
+            'messages': 1,
+            'words': df['message'].astype(str).str.count(r'\S+')
+        })
+        hour = rows.groupby(['bucket', 'sender'], observed=True, sort=True).sum().reset_index()
+        day = _rollup(hour, 'day')
+        return cls({'hour': hour, 'day': day, 'week': _rollup(day, 'week'), 'month': _rollup(day, 'month')})
+
+    # Sum several stores, e.g. the chats of a comparison
+    @classmethod
+    def combine(cls, stores):
+        levels = {}
+        for level in LEVELS:
+            table = pd.concat([store.levels[level] for store in stores], ignore_index=True)
+            table['sender'] = table['sender'].astype(str).astype('category')
+            levels[level] = (table.groupby(['bucket', 'sender'], observed=True, sort=True)
+                             [['messages', 'words']].sum().reset_index())
+        return cls(levels)
+
+    @property
+    def nbytes(self):
+        return sum(int(table.memory_usage(deep=True).sum()) for table in self.levels.values())
+
+    # Store narrowed to a sender and an inclusive date range, like filter_chat
+    def filter(self, sender=None, start_date=None, end_date=None):
+        if not (sender or start_date or end_date):
+            return self
+        start = pd.Timestamp(start_date) if start_date else None
+        stop = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date else None
+        day = _slice(self.levels['day'], sender, start, stop)
+        levels = {'hour': _slice(self.levels['hour'], sender, start, stop), 'day': day}
+        for level in ('week', 'month'):
+            # Buckets lying wholly inside the range, plus the partial edge buckets rebuilt from days
+            whole = _slice(self.levels[level], sender, start, stop)
+            if stop is not None:
+                whole = whole[_next_bucket(whole['bucket'], level) <= stop]
+            edges = day[~_floor(day['bucket'], level).isin(whole['bucket'].unique())]
+            table = pd.concat([whole, _rollup(edges, level)], ignore_index=True)
+            levels[level] = table.sort_values('bucket', kind='stable', ignore_index=True)
+        return RollupStore(levels)
+
+    # Messages and words per sender, read from the coarsest level
+    def totals(self):
+        month = self.levels['month']
+        totals = month.groupby(month['sender'].astype(str).rename('sender'))[['messages', 'words']].sum()
+        return totals.sort_values('messages', ascending=False, kind='stable')
+
+    # Messages per bucket at the given resolution
+    def series(self, resolution='day'):
+        table = self.levels[resolution]
+        return table.groupby('bucket', sort=True)['messages'].sum()
+
+    # Messages per hour of day
+    def by_hour(self):
+        hour = self.levels['hour']
+        return hour.groupby(hour['bucket'].dt.hour.rename('hour'))['messages'].sum()
+
+    # Messages per day of week
+    def by_weekday(self):
+        day = self.levels['day']
+        return day.groupby(day['bucket'].dt.day_name().rename('weekday'))['messages'].sum()
+
+    # Whole days between the first and last active day
+    def total_days(self):
+        days = self.levels['day']['bucket']
+        return (days.iloc[-1] - days.iloc[0]).days if len(days) else 0
@@ -0,0 +1,147 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from .analysis import filter_chat
+
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+# Messages indexed per step of SearchIndex.build, which bounds its temporary arrays
+BUILD_CHUNK = 50_000
+
+
+# Hash each run of three code points to a uint32 trigram key. Collisions only
+# add candidates, which are verified against the message text anyway.
+def _trigram_keys(codes):
+    codes = codes.astype(np.uint32)
+    with np.errstate(over='ignore'):
+        return (codes[:-2] * np.uint32(0x9E3779B1)) ^ (codes[1:-1] * np.uint32(0x85EBCA77)) ^ codes[2:]
+
+
+# Code points of a string as a uint32 array
+def _codes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+# Mask of the first element of each run in a sorted array. Cheaper than np.unique,
+# which no longer sorts for every dtype.
+def _first_of_run(values):
+    mask = np.ones(len(values), dtype=bool)
+    mask[1:] = values[1:] != values[:-1]
+    return mask
+
+
+# Sorted, deduped (trigram << 32 | row) pairs of a slice of messages whose first row is offset
+def _trigram_pairs(messages, offset):
+    folded = messages.astype(str).str.casefold()
+    lengths = folded.str.len().to_numpy(dtype=np.int64)
+    codes = _codes(''.join(folded))
+    row_of_char = np.repeat(np.arange(offset, offset + len(lengths), dtype=np.uint64), lengths)
+
+    # Keep only trigrams that do not cross a message boundary, then
+    # dedupe (trigram, row) pairs with a single sort of packed uint64s
+    within = row_of_char[:-2] == row_of_char[2:]
+    pairs = (_trigram_keys(codes)[within].astype(np.uint64) << np.uint64(32)) | row_of_char[:-2][within]
+    pairs.sort()
+    return pairs[_first_of_run(pairs)]
+
+
+class SearchIndex:
+    """
+    Trigram index over the message column, built once at parse time.
+
+    Postings are stored CSR-style: the rows containing trigrams[i] are
+    rows[starts[i]:starts[i + 1]], sorted ascending. Messages are indexed a
+    chunk at a time, so building needs little more memory than the index.
+    """
+
+    def __init__(self, trigrams, starts, rows):
+        self.trigrams = trigrams
+        self.starts = starts
+        self.rows = rows
+
+    @classmethod
+    def build(cls, messages, chunk_size=BUILD_CHUNK):
+        # Deduped (trigram, row) pairs of each chunk; rows never repeat across chunks
+        chunks = [
+            _trigram_pairs(messages.iloc[start:start + chunk_size], start)
+            for start in range(0, len(messages), chunk_size)
+        ]
+        pairs = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint64)
+        del chunks
+        pairs.sort()
+
+        # The low half of each pair is its row; shift the trigram down in place
+        rows = pairs.astype(np.uint32)
+        pairs >>= np.uint64(32)
+        keys = pairs.astype(np.uint32)
+        del pairs
+        starts = np.flatnonzero(_first_of_run(keys))
+        return cls(keys[starts], np.append(starts, len(rows)), rows)
+
+    @property
+    def nbytes(self):
+        return self.trigrams.nbytes + self.starts.nbytes + self.rows.nbytes
+
+    # Candidate rows that contain every trigram of term, or None if term is too short to index
+    def candidates(self, term):
+        if len(term) < 3:
+            return None
+        keys = np.unique(_trigram_keys(_codes(term)))
+        if len(self.trigrams) == 0:
+            return np.empty(0, dtype=np.uint32)
+        positions = np.minimum(np.searchsorted(self.trigrams, keys), len(self.trigrams) - 1)
+        if not (self.trigrams[positions] == keys).all():
+            return np.empty(0, dtype=np.uint32)
+        postings = sorted(
+            (self.rows[self.starts[p]:self.starts[p + 1]] for p in positions),
+            key=len
+        )
+        result = postings[0]
+        for posting in postings[1:]:
+            result = np.intersect1d(result, posting, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+
+# Split a query into terms; "quoted text" is kept together as one phrase
+def parse_query(query):
+    return [(phrase or word).casefold() for phrase, word in QUERY_PATTERN.findall(query)]
+
+
+# Row positions of messages containing every term of the query, case-insensitively
+def search_messages(df, index, query):
+    terms = parse_query(query)
+    if not terms:
+        return np.empty(0, dtype=np.int64)
+
+    # Narrow with the index using the most selective terms, then verify on the text
+    candidates = None
+    for term in sorted(terms, key=len, reverse=True):
+        rows = index.candidates(term)
+        if rows is None:
+            continue
+        candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64)
+
+    messages = df['message'] if candidates is None else df['message'].iloc[candidates]
+    folded = messages.astype(str).str.casefold()
+    mask = np.ones(len(folded), dtype=bool)
+    for term in terms:
+        mask &= folded.str.contains(term, regex=False).to_numpy(dtype=bool)
+    positions = np.arange(len(df)) if candidates is None else candidates.astype(np.int64)
+    return positions[mask]
+
+
+# Messages matching the query, narrowed by the usual sender and date filters
+def search_chat(df, index, query, sender=None, start_date=None, end_date=None):
+    hits = df.iloc[search_messages(df, index, query)]
+    return filter_chat(hits, sender=sender, start_date=start_date, end_date=end_date)
+
+
+# Hits per day for a search result, ready to plot
+def hits_timeline(hits):
+    return hits.groupby('date').size() if len(hits) else pd.Series(dtype='int64')
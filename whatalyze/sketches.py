@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 1_000_000
+
+# z-score used for the ~95% error bounds reported alongside estimates
+Z_95 = 1.96
+
+
+# 64-bit hashes of values; the fixed pandas hash key keeps them comparable across chats
+def _hash_values(values):
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+
+# Number of leading zero bits of each uint64, by vectorized binary search
+def _leading_zeros(values):
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = values < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[small] += shift
+        values[small] <<= np.uint64(shift)
+    zeros[values == 0] = 64
+    return zeros
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with 2**p one-byte registers.
+
+    The relative standard error is 1.04 / sqrt(2**p), about 0.8% at the
+    default p=14. Sketches with the same p merge by taking register maxima.
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, values):
+        hashes = _hash_values(values)
+        if len(hashes) == 0:
+            return self
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # Guard bit keeps the rank bounded once the index bits are shifted out
+        rest = (hashes << np.uint64(self.p)) | (np.uint64(1) << np.uint64(self.p - 1))
+        np.maximum.at(self.registers, index, _leading_zeros(rest) + 1)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with p={self.p} and p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        if raw <= 2.5 * m and empty:
+            return m * np.log(m / empty)
+        return float(raw)
+
+
+class FrequentItems:
+    """
+    Mergeable frequent-items summary (Misra-Gries, the counter-based dual of
+    Space-Saving) holding at most k counters.
+
+    Each kept count undercounts the true frequency by at most `error`, which
+    never exceeds total / (k + 1). Items outside the summary occur at most
+    `error` times.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.counts = pd.Series(dtype='int64')
+        self.error = 0
+        self.total = 0
+
+    # Add raw items, counted exactly one chunk at a time
+    def add(self, values):
+        values = pd.Series(values)
+        for start in range(0, len(values), CHUNK_SIZE):
+            self.add_counts(values.iloc[start:start + CHUNK_SIZE].value_counts())
+        return self
+
+    # Add exact item -> count pairs
+    def add_counts(self, counts):
+        self.total += int(counts.sum())
+        self._prune(self.counts.add(counts, fill_value=0))
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.error += other.error
+        self._prune(self.counts.add(other.counts, fill_value=0))
+        return self
+
+    # Keep the k largest counters, subtracting the (k+1)-th count from all of them
+    def _prune(self, counts):
+        counts = counts.sort_values(ascending=False, kind='stable')
+        if len(counts) > self.k:
+            cut = counts.iloc[self.k]
+            self.error += int(cut)
+            counts = counts.iloc[:self.k] - cut
+            counts = counts[counts > 0]
+        self.counts = counts.astype('int64')
+
+    # Most frequent items with their lower/upper frequency bounds
+    def top(self, n=10):
+        counts = self.counts.head(n)
+        return pd.DataFrame({
+            'count': counts,
+            'lower': counts,
+            'upper': counts + self.error
+        })
+
+
+# Uniform sample of k rows without replacement: every row draws a random
+# priority and the k smallest form the reservoir, in original row order.
+def reservoir_sample(df, k, seed=0):
+    if len(df) <= k:
+        return df
+    priorities = np.random.default_rng(seed).random(len(df))
+    keep = np.sort(np.argpartition(priorities, k)[:k])
+    return df.iloc[keep]
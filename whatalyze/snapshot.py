@@ -0,0 +1,212 @@
+import io
+import json
+import os
+import struct
+import zipfile
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .analysis import analyze_chat, count_words
+from .emojis import build_emoji_matrix
+from .profiles import SenderProfiles
+from .rollups import LEVELS, RollupStore
+from .search import SearchIndex
+
+SNAPSHOT_FORMAT = 'whatalyze-snapshot'
+SNAPSHOT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+# Members start on this boundary so their Arrow buffers can be used in place
+ALIGNMENT = 64
+
+# Extra-field id used to pad local zip headers up to the alignment (as zipalign does)
+PADDING_EXTRA_ID = 0xD935
+
+# Analysis entries kept as tables; the scalar entries go in the manifest
+ANALYSIS_SERIES = ['messages_by_sender', 'messages_by_date', 'messages_by_hour', 'messages_by_weekday', 'emoji_counts']
+ANALYSIS_SCALARS = ['total_messages', 'total_days', 'avg_messages_per_day', 'distinct_senders', 'words_per_message']
+
+
+# Arrow IPC file holding a frame, index included
+def _arrow_bytes(frame, compression=None):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+# Store a member uncompressed, padding its local header so the data is aligned
+def _write_aligned(archive, name, data):
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_STORED
+    data_offset = archive.fp.tell() + 30 + len(name.encode('utf-8')) + 4
+    padding = -data_offset % ALIGNMENT
+    info.extra = struct.pack('<HH', PADDING_EXTRA_ID, padding) + b'\0' * padding
+    archive.writestr(info, bytes(data) if not isinstance(data, bytes) else data)
+
+
+# Tables making up a snapshot of a loaded chat, by member name
+def _snapshot_tables(chat, analysis, word_counts):
+    index = chat['search_index']
+    profiles = chat['profiles']
+    tables = {
+        'messages': chat['df'],
+        'emojis': chat['emoji_data'][0],
+        'search_trigrams': pd.DataFrame({'value': index.trigrams}),
+        'search_starts': pd.DataFrame({'value': index.starts}),
+        'search_rows': pd.DataFrame({'value': index.rows}),
+        'profiles': profiles.table,
+        'profile_hours': profiles.hours.set_axis(profiles.hours.columns.astype(str), axis=1),
+        'profile_positions': pd.DataFrame({'value': profiles.positions}),
+        'attachments': chat['attachments']
+    }
+    if word_counts is not None:
+        tables['word_counts'] = word_counts.to_frame('count')
+    for level in LEVELS:
+        tables[f'rollup_{level}'] = chat['rollups'].levels[level]
+    if chat['media_index'] is not None:
+        tables['media_index'] = chat['media_index']
+    for name in ANALYSIS_SERIES:
+        # Sums over the sparse emoji matrix stay sparse, which Arrow does not store
+        series = analysis[name]
+        if isinstance(series.dtype, pd.SparseDtype):
+            series = series.sparse.to_dense()
+        tables[f'analysis_{name}'] = series.to_frame('value')
+    return tables
+
+
+# Write a loaded chat (the dict returned by load_chat) as a snapshot: an
+# uncompressed zip of Arrow IPC files plus a JSON manifest. The exact analysis
+# of the whole chat and its word frequencies are computed unless passed in.
+# target is a path or binary file; without one the snapshot is returned as bytes.
+# compression ('zstd' or 'lz4') shrinks the files for sharing, but compressed
+# buffers are decompressed on load instead of being used in place.
+# words=False leaves the word frequencies out, e.g. for a snapshot that only
+# carries a chat between processes.
+def write_snapshot(chat, target=None, analysis=None, word_counts=None, compression=None, words=True):
+    df = chat['df']
+    # A chat loaded from a snapshot already carries both
+    analysis = analysis or chat.get('analysis') or \
+        analyze_chat(df, chat['emoji_data'], rollups=chat['rollups'], profiles=chat['profiles'])
+    if word_counts is None and words:
+        word_counts = chat['word_counts'] if 'word_counts' in chat else count_words(df)
+
+    tables = _snapshot_tables(chat, analysis, word_counts)
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'compression': compression,
+        'unmatched_lines': int(chat['unmatched_lines']),
+        'analysis': {
+            **{name: float(analysis[name]) if pd.notna(analysis[name]) else None for name in ANALYSIS_SCALARS},
+            'most_common_emojis': analysis['most_common_emojis']
+        },
+        'tables': {name: {'file': f'{name}.arrow', 'rows': len(frame)} for name, frame in tables.items()}
+    }
+
+    output = io.BytesIO() if target is None else target
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=2, ensure_ascii=False))
+        for name, frame in tables.items():
+            _write_aligned(archive, manifest['tables'][name]['file'], _arrow_bytes(frame, compression))
+    return output.getvalue() if target is None else None
+
+
+# Manifest of a snapshot, or None if source is not a snapshot
+def read_manifest(source):
+    source = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    if not zipfile.is_zipfile(source):
+        return None
+    with zipfile.ZipFile(source) as archive:
+        if MANIFEST not in archive.namelist():
+            return None
+        manifest = json.loads(archive.read(MANIFEST))
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')}.")
+    return manifest
+
+
+# Arrow buffer of a stored member, sliced from the snapshot buffer without copying
+def _member_buffer(buffer, info):
+    header = buffer.slice(info.header_offset, 30).to_pybytes()
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    start = info.header_offset + 30 + name_length + extra_length
+    return buffer.slice(start, info.file_size)
+
+
+# Load a snapshot written by write_snapshot into the same dict load_chat
+# returns, plus the stored 'analysis' and 'word_counts' (if saved). A path is memory
+# mapped, so numeric columns are used in place rather than read into memory.
+def load_snapshot(source):
+    import pyarrow as pa
+
+    if isinstance(source, (str, os.PathLike)):
+        buffer = pa.memory_map(os.fspath(source)).read_buffer()
+    else:
+        buffer = pa.py_buffer(source)
+    manifest = read_manifest(pa.BufferReader(buffer))
+    if manifest is None:
+        raise ValueError("Not a whatalyze snapshot.")
+
+    with zipfile.ZipFile(pa.BufferReader(buffer)) as archive:
+        infos = {info.filename: info for info in archive.infolist()}
+
+    def table(name):
+        entry = manifest['tables'].get(name)
+        if entry is None:
+            return None
+        return pa.ipc.open_file(_member_buffer(buffer, infos[entry['file']])).read_all()
+
+    def frame(name):
+        arrow_table = table(name)
+        return None if arrow_table is None else arrow_table.to_pandas()
+
+    def array(name):
+        return table(name).column('value').combine_chunks().to_numpy(zero_copy_only=False)
+
+    df = frame('messages')
+    emojis = frame('emojis')
+    emoji_data = (emojis, build_emoji_matrix(emojis))
+    profiles = frame('profiles')
+    hours = frame('profile_hours')
+    hours.columns = pd.Index(hours.columns.astype(int), name='hour')
+    chat = {
+        'df': df,
+        'unmatched_lines': manifest['unmatched_lines'],
+        'emoji_data': emoji_data,
+        'search_index': SearchIndex(array('search_trigrams'), array('search_starts'), array('search_rows')),
+        'rollups': RollupStore({level: frame(f'rollup_{level}') for level in LEVELS}),
+        'profiles': SenderProfiles(profiles, hours, array('profile_positions')),
+        'media_index': frame('media_index'),
+        'attachments': frame('attachments')
+    }
+
+    stored = manifest['analysis']
+    analysis = {name: frame(f'analysis_{name}')['value'] for name in ANALYSIS_SERIES}
+    analysis.update({
+        'total_messages': int(stored['total_messages']),
+        'total_days': int(stored['total_days']),
+        'avg_messages_per_day': stored['avg_messages_per_day'],
+        'distinct_senders': int(stored['distinct_senders']),
+        'words_per_message': stored['words_per_message'],
+        'most_common_emojis': [(e, int(c)) for e, c in stored['most_common_emojis']],
+        'emoji_matrix': emoji_data[1],
+        'sender_sketch': None,
+        'sample': None,
+        'rollups': chat['rollups'],
+        'profiles': chat['profiles'],
+        'approximate': False,
+        'error_bounds': {}
+    })
+    chat['analysis'] = analysis
+    if 'word_counts' in manifest['tables']:
+        chat['word_counts'] = frame('word_counts')['count']
+    return chat
@@ -0,0 +1,21 @@
+import sys
+
+from .loader import READ_ERRORS, UNREADABLE, load_chat
+from .snapshot import write_snapshot
+
+
+# Parse worker started by load_chat_in_worker: python -m whatalyze.worker EXPORT SNAPSHOT
+# Writes the parsed chat to SNAPSHOT, or exits with UNREADABLE and the reason on stderr.
+def main():
+    export, snapshot = sys.argv[1:3]
+    try:
+        chat = load_chat(export)
+    except READ_ERRORS as e:
+        print(e, file=sys.stderr)
+        sys.exit(UNREADABLE)
+    # Word frequencies are left out; they are counted only if the chat is saved
+    write_snapshot(chat, snapshot, words=False)
+
+
+if __name__ == '__main__':
+    main()